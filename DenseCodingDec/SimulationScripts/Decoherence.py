@@ -5,7 +5,9 @@ import os
 import qutip
 import numpy as np
 
-from pkg.KrausOperators import KrausOperators,evolve
+from pkg.KrausOperators import KrausOperators
+from pkg.channel import KrausChannel
+from pkg.trajectory import Trajectory
 
 MAP={
     "bit_flip_ch":KrausOperators.SingleQubit.bit_flip_ch,
@@ -17,33 +19,42 @@ MAP={
 
 PARAM_FILE=os.path.join(os.getcwd(),"Decoherence","parameters.json")
 INTERVAL=50
-R=None
-BLOCH=None
+SEGMENTS=None
+VECTOR=None
 
-def bloch_sphere(rho: qutip.Qobj) -> tuple:
-    return np.real((rho*qutip.sigmax()).tr()),np.real((rho*qutip.sigmay()).tr()),np.real((rho*qutip.sigmaz()).tr())
+def segments(bloch: np.ndarray) -> np.ndarray:
+    '''
+    Returns the (T, 3, 2) origin-to-tip segments of the Bloch vectors in the axes of qutip.Bloch (x -> -y, y -> x)
+    '''
+    S=np.zeros(bloch.shape[:-1]+(3,2))
+    S[...,0,1]=bloch[...,1]
+    S[...,1,1]=-bloch[...,0]
+    S[...,2,1]=bloch[...,2]
+    return S
 
-def update(frame: int)-> None:
-    BLOCH.clear()
-    BLOCH.add_vectors(R[frame])
-    BLOCH.render()
+def update(frame: int)-> tuple:
+    # the sphere is drawn once: each frame only points the vector at a row of the precomputed buffer
+    VECTOR.set_data_3d(SEGMENTS[frame,0],SEGMENTS[frame,1],SEGMENTS[frame,2])
+    return (VECTOR,)
 
 def main() -> None:
-    global R,BLOCH
+    global SEGMENTS,VECTOR
     with open(PARAM_FILE,mode="r",encoding="utf-8") as f:
         PARAM=json.load(f)
     KRAUS=MAP[PARAM["type"]](PARAM["p"])
     steps=PARAM["steps"]
-    frames=[qutip.Qobj(PARAM["rho"]).unit(inplace=False)]+[None for _ in range(steps-1)]
-    R=[bloch_sphere(frames[0])]+[None for _ in range(steps-1)]
-    for i in range(1,steps):
-        frames[i]=evolve(frames[i-1],KRAUS)
-        R[i]=bloch_sphere(frames[i])
+    stride=PARAM.get("stride",1)
+    rho=qutip.Qobj(PARAM["rho"]).unit(inplace=False)
+    # frame i shows the state after i*stride applications, straight from the channel power
+    TRAJ=Trajectory.from_channel(KrausChannel(KRAUS),rho,np.arange(steps)*stride)
+    if "export" in PARAM: TRAJ.save(PARAM["export"])
+    SEGMENTS=segments(TRAJ.get_bloch())
     fig=plt.figure()
     ax = fig.add_subplot(111, projection='3d')
     BLOCH=qutip.Bloch(fig=fig,axes=ax)
-    BLOCH.vector_color='green'
-    ani=FuncAnimation(fig,update,frames=PARAM["steps"],interval=INTERVAL)
+    BLOCH.render()
+    VECTOR,=ax.plot(*SEGMENTS[0],color='green',lw=3,marker='o',markevery=[1])
+    ani=FuncAnimation(fig,update,frames=len(TRAJ),interval=INTERVAL)
     plt.show()
     
 if __name__=="__main__":
@@ -3,7 +3,8 @@ import qutip
 import numpy as np
 import matplotlib.pyplot as plt
 
-from pkg.KrausOperators import KrausOperators,evolve
+from pkg.KrausOperators import KrausOperators
+from pkg.channel import KrausChannel
 
 BELL=(qutip.basis(4,0)+qutip.basis(4,3)).unit()
 RHO=(BELL@BELL.dag()).unit()
@@ -17,27 +18,26 @@ SQ_KRAUS=KrausOperators.SingleQubit.phase_flip_ch
 OBJ=qutip.basis(4,0)
 T=np.asarray([[1,0,0,0],[0,0,0,0],[0,0,0,0],[0,0,0,0]])
 
-def concurrence(rho: qutip.Qobj) -> float:
+def concurrence(rho) -> np.ndarray:
+    '''
+    Wootters concurrence of a two-qubit density matrix or of a batch (..., 4, 4)
+    '''
+    rho=rho.full() if isinstance(rho,qutip.Qobj) else np.asarray(rho)
     sigma_y=qutip.sigmay().full()
     flip=(np.kron(sigma_y,sigma_y))
-    rho_tilde=np.dot(np.dot(flip,rho.conj().full()),flip)
-    R=rho.full()@rho_tilde
+    rho_tilde=flip@rho.conj()@flip
+    R=rho@rho_tilde
     e=(np.linalg.eigvals(R))
-    s=np.sort(np.sqrt(e))
-    return max(0,s[3]-s[2]-s[1]-s[0])
+    s=np.sort(np.sqrt(np.clip(e.real,0,None)),axis=-1)
+    return np.maximum(0,s[...,3]-s[...,2]-s[...,1]-s[...,0])
     
 
 def main() -> None:
     pspace=np.linspace(0,1,math.ceil(1/P_STEP))
-    c_s=[0 for _ in range(len(pspace))]
-    f=[0 for _ in range(len(pspace))]
-    for k,p in enumerate(pspace):
-        sqk=SQ_KRAUS(p)
-        bsk = [ qutip.Qobj(qutip.tensor(sqk[j],I).full()) for j in range(len(sqk))]
-        rhop=evolve(RHO,bsk)
-        print(rhop)
-        c_s[k]=concurrence(rhop)
-        f[k]=(U.full()@rhop.full()@U.dag().full())[0][0]
+    channel=KrausChannel.sweep(SQ_KRAUS,pspace).extend(2)
+    rhop=channel.apply(RHO.full())
+    c_s=concurrence(rhop)
+    f=np.real((U.full()@rhop@U.dag().full())[:,0,0])
     plt.plot(pspace,c_s,color="red")
     plt.plot(pspace,f,color="green")
     plt.xlabel("p")
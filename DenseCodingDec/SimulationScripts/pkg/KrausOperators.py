@@ -1,62 +1,83 @@
 import qutip
 import numpy as np
 
+from pkg.channel import KrausChannel,PAULI,vectorized
+
+def _check(p,name: str="Probability") -> np.ndarray:
+    p=np.asarray(p,dtype=float)
+    if np.any((p<0)|(p>1)): raise ValueError("{n} must be a real number 0<=p<=1".format(n=name))
+    return p
+
+def _kraus(p,stack: np.ndarray) -> list:
+    # a scalar p keeps the list of qutip.Qobj, an array of p gets the (..., k, 2, 2) stack
+    return [qutip.Qobj(K) for K in stack] if np.ndim(p)==0 else stack
+
+def _pauli_mix(p,weights: list,paulis: list) -> list:
+    return _kraus(p,np.sqrt(np.stack(weights,axis=-1))[...,None,None]*PAULI[paulis])
+
 class KrausOperators(object):
     class SingleQubit(object):
         @staticmethod
+        @vectorized
         def bit_flip_ch(p: float) -> list:
             '''
             Returns the Kraus operators for modeling a bit-flip channel for a single qubit
             
-            p: bit-flip probability
+            p: bit-flip probability, or an array of them (returns the stack (..., 2, 2, 2) instead)
             '''
-            if p<0 or p>1: raise ValueError("Probability must be a real number 0<=p<=1")
-            return [np.sqrt(1-p)*qutip.identity(2),np.sqrt(p)*qutip.sigmax()]
+            q=_check(p)
+            return _pauli_mix(p,[1-q,q],[0,1])
         
         @staticmethod
+        @vectorized
         def phase_flip_ch(p: float) -> list:
             '''
             Returns the Kraus operators for modeling a phase-flip channel for a single qubit
             
-            p: phase-flip probability
+            p: phase-flip probability, or an array of them (returns the stack (..., 2, 2, 2) instead)
             '''
-            if p<0 or p>1: raise ValueError("Probability must be a real number 0<=p<=1")
-            return [np.sqrt(1-p)*qutip.identity(2),np.sqrt(p)*qutip.sigmaz()]
+            q=_check(p)
+            return _pauli_mix(p,[1-q,q],[0,3])
         
         @staticmethod
+        @vectorized
         def bit_phase_flip_ch(p: float) -> list:
             '''
             Returns the Kraus operators for modeling a bit-phase-flip channel for a single qubit
             
-            p: bit-phase-flip probability
+            p: bit-phase-flip probability, or an array of them (returns the stack (..., 2, 2, 2) instead)
             '''
-            if p<0 or p>1: raise ValueError("Probability must be a real number 0<=p<=1")
-            return [np.sqrt(1-p)*qutip.identity(2),np.sqrt(p)*qutip.sigmay()]
+            q=_check(p)
+            return _pauli_mix(p,[1-q,q],[0,2])
         
         @staticmethod
+        @vectorized
         def depolarizing_ch(p: float) -> list:
             '''
             Returns the Kraus operators for modeling a bit-phase-flip channel for a single qubit
             
-            p: depolarizing coefficient
+            p: depolarizing coefficient, or an array of them (returns the stack (..., 4, 2, 2) instead)
             '''
-            if p<0 or p>1: raise ValueError("Depolarizing coefficient must be a real number 0<=p<=1")
-            n=np.sqrt(p/3)
-            return [np.sqrt(1-p)*qutip.identity(2),n*qutip.sigmax(),n*qutip.sigmay(),n*qutip.sigmaz()]
+            q=_check(p,"Depolarizing coefficient")
+            return _pauli_mix(p,[1-q,q/3,q/3,q/3],[0,1,2,3])
         
         @staticmethod
+        @vectorized
         def amplitude_damping_ch(p: float) -> list:
             '''
             Returns the Kraus operators for modeling an amplitude damping channel for a single qubit
             
-            p: damping probability
+            p: damping probability, or an array of them (returns the stack (..., 2, 2, 2) instead)
             '''
-            if p<0 or p>1: raise ValueError("Probability must be a real number 0<=p<=1")
-            return [qutip.Qobj([[1,0],[0,np.sqrt(1-p)]]),qutip.Qobj([[0,np.sqrt(p)],[0,0]])]
+            q=_check(p)
+            K=np.zeros(q.shape+(2,2,2),dtype=complex)
+            K[...,0,0,0]=1
+            K[...,0,1,1]=np.sqrt(1-q)
+            K[...,1,0,1]=np.sqrt(q)
+            return _kraus(p,K)
         
 def evolve(rho: qutip.Qobj,kraus_operators: list[qutip.Qobj]) -> qutip.Qobj:
-    start=qutip.Qobj(np.zeros((4,4)))
-    for i in range(0,len(kraus_operators)):
-        c=kraus_operators[i]@rho@(kraus_operators[i].dag())
-        start+=kraus_operators[i]@rho@(kraus_operators[i].dag())
-    return start
\ No newline at end of file
+    '''
+    Returns Σ K ρ K† for Kraus operators of any dimension matching rho
+    '''
+    return KrausChannel(kraus_operators).apply(rho)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import qutip
+import numpy as np
+
+COND=1e10
+PAULI=np.array([[[1,0],[0,1]],[[0,1],[1,0]],[[0,-1j],[1j,0]],[[1,0],[0,-1]]],dtype=complex)
+
+def vectorized(kraus):
+    '''
+    Marks a function p -> Kraus operators that also accepts an array of p, returning the stack (..., k, d, d):
+    KrausChannel.sweep then calls it once on the whole pspace
+    '''
+    kraus.vectorized=True
+    return kraus
+
+class KrausChannel(object):
+    '''
+    Quantum channel I_before ⊗ E ⊗ I_after, with E stored as a stack of Kraus operators of shape (..., k, d, d)
+
+    Leading axes index a batch of channels (e.g. a sweep over p): every method acts on all of them at once
+    '''
+    def __init__(self,kraus_operators,before: int=1,after: int=1) -> None:
+        if isinstance(kraus_operators,(list,tuple)):
+            kraus_operators=[K.full() if isinstance(K,qutip.Qobj) else K for K in kraus_operators]
+        K=np.asarray(kraus_operators,dtype=complex)
+        if K.ndim<3 or K.shape[-1]!=K.shape[-2]: raise ValueError("Kraus operators must be square matrices stacked as (..., k, d, d)")
+        self.__K=K
+        self.__before=before
+        self.__after=after
+        self.__local=None
+        self.__S=None
+        self.__eig=None
+
+    @classmethod
+    def sweep(cls,kraus,pspace) -> "KrausChannel":
+        '''
+        Returns the batch of channels kraus(p) for every p in pspace
+
+        kraus: a KrausOperators.SingleQubit method (called once on the whole pspace) or any function
+        p -> list of Kraus operators (called for each p)
+        '''
+        pspace=np.asarray(pspace,dtype=float)
+        if getattr(kraus,"vectorized",False): return cls(kraus(pspace))
+        stack=np.array([KrausChannel(kraus(p)).get_kraus() for p in pspace.ravel()])
+        return cls(stack.reshape(pspace.shape+stack.shape[1:]))
+
+    def get_kraus(self) -> np.ndarray:
+        '''
+        Returns the full Kraus stack (..., k, D, D), identities included
+        '''
+        K=np.einsum("ab,...ij,cd->...aicbjd",np.eye(self.__before),self.__K,np.eye(self.__after))
+        return K.reshape(self.__K.shape[:-2]+(self.get_dim(),)*2)
+
+    def get_dim(self) -> int:
+        return self.__K.shape[-1]*self.__before*self.__after
+
+    def extend(self,dim: int,before: bool=False) -> "KrausChannel":
+        '''
+        Returns the channel E⊗I acting on a larger system (I⊗E if before), sharing the Kraus stack
+
+        dim: dimension of the untouched subsystem
+        '''
+        if before: return KrausChannel(self.__K,self.__before*dim,self.__after)
+        return KrausChannel(self.__K,self.__before,self.__after*dim)
+
+    def __local_superoperator(self) -> np.ndarray:
+        # L[..., i, j, m, l] = Σ_k K[k, i, j] K*[k, m, l], one batched matmul over the flattened operators
+        if self.__local is None:
+            d=self.__K.shape[-1]
+            K=self.__K.reshape(self.__K.shape[:-2]+(d*d,))
+            self.__local=(K.swapaxes(-1,-2)@K.conj()).reshape(self.__K.shape[:-3]+(d,)*4)
+        return self.__local
+
+    def apply(self,rho):
+        '''
+        Returns Σ K ρ K† for one density matrix or a batch (..., D, D), broadcast against the channel batch
+
+        Only E's d⁴ superoperator entries are contracted with ρ; for a single ρ this is one matrix product
+        for the whole channel batch. A qutip.Qobj in gives a qutip.Qobj out (single channel only)
+        '''
+        if isinstance(rho,qutip.Qobj):
+            if self.__K.ndim!=3: raise ValueError("A batch of channels returns arrays: pass rho as an array")
+            return qutip.Qobj(self.apply(rho.full()),dims=rho.dims)
+        rho=np.asarray(rho)
+        D=self.get_dim()
+        if rho.shape[-2:]!=(D,D): raise ValueError("Density matrix and Kraus operators dimensions do not match")
+        d=self.__K.shape[-1]
+        r=rho.reshape(rho.shape[:-2]+(self.__before,d,self.__after)*2)
+        out=np.einsum("...ijml,...xjyzlw->...xiyzmw",self.__local_superoperator(),r,optimize=True)
+        return out.reshape(out.shape[:-6]+(D,D))
+
+    def superoperator(self) -> np.ndarray:
+        '''
+        Returns the Liouville matrix S=Σ K⊗K* (..., D², D²), so that vec(Σ K ρ K†)=S vec(ρ) with row-major vec
+        '''
+        if self.__S is None:
+            K=self.get_kraus()
+            D=self.get_dim()
+            self.__S=np.einsum("...kij,...klm->...iljm",K,K.conj()).reshape(K.shape[:-3]+(D*D,D*D))
+        return self.__S
+
+    def apply_superoperator(self,rho: np.ndarray) -> np.ndarray:
+        '''
+        Same as apply, as a single mat-vec with the cached superoperator
+        '''
+        D=self.get_dim()
+        rho=np.asarray(rho)
+        S=self.superoperator()
+        vec=rho.reshape(rho.shape[:-2]+(D*D,))
+        return (S@vec[...,None])[...,0].reshape(np.broadcast_shapes(S.shape[:-2],rho.shape[:-2])+(D,D))
+
+    def __eigen(self):
+        # S=V diag(w) V⁻¹, or None when the eigenvectors are too ill-conditioned to trust (near-defective S)
+        if self.__eig is None:
+            w,V=np.linalg.eig(self.superoperator())
+            self.__eig=(w,V,np.linalg.inv(V)) if np.all(np.linalg.cond(V)<COND) else False
+        return self.__eig or None
+
+    def power(self,n: int) -> np.ndarray:
+        '''
+        Returns S^n, the superoperator of n applications, from the eigendecomposition of S (exponentiation
+        by squaring when S is not safely diagonalizable)
+        '''
+        if n<0: raise ValueError("Number of applications must be a non-negative integer")
+        eig=self.__eigen()
+        if eig is None: return np.linalg.matrix_power(self.superoperator(),int(n))
+        w,V,Vi=eig
+        return (V*(w**n)[...,None,:])@Vi
+
+    def trajectory(self,rho,steps) -> np.ndarray:
+        '''
+        Returns ρ after n applications for every n in steps, shape (len(steps), ..., D, D), without the
+        intermediate states
+
+        rho: initial density matrix (qutip.Qobj or array)
+        steps: non-negative integer numbers of applications, in any order
+        '''
+        steps=np.asarray(steps)
+        if steps.ndim!=1 or not np.issubdtype(steps.dtype,np.integer) or np.any(steps<0): raise ValueError("steps must be a 1D array of non-negative integers")
+        rho=rho.full() if isinstance(rho,qutip.Qobj) else np.asarray(rho)
+        D=self.get_dim()
+        vec=rho.reshape(rho.shape[:-2]+(D*D,))
+        eig=self.__eigen()
+        if eig is None:
+            out=np.stack([(self.power(n)@vec[...,None])[...,0] for n in steps])
+        else:
+            w,V,Vi=eig
+            c=(Vi@vec[...,None])[...,0]
+            lam=w**steps.reshape((-1,)+(1,)*w.ndim)
+            out=np.einsum("...ij,t...j->t...i",V,lam*c)
+        return out.reshape(out.shape[:-1]+(D,D))
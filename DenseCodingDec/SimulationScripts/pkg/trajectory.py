@@ -0,0 +1,83 @@
+import qutip
+import numpy as np
+
+from pkg.channel import KrausChannel,PAULI
+
+def bloch_sphere(rho,out: np.ndarray=None) -> np.ndarray:
+    '''
+    Bloch vectors (..., 3) of a single-qubit density matrix or of a batch (..., 2, 2), one einsum against the Pauli stack
+
+    out: optional complex buffer (..., 3) the traces are written into, so that repeated calls do not allocate
+    '''
+    rho=rho.full() if isinstance(rho,qutip.Qobj) else np.asarray(rho)
+    return np.real(np.einsum("...ij,kji->...k",rho,PAULI[1:],out=out))
+
+class Trajectory(object):
+    '''
+    Single-qubit states ρ(n) for a sequence of step counts n, kept in one contiguous (T, 2, 2) complex buffer
+    together with their (T, 3) Bloch vectors
+
+    Both buffers are allocated once: refilling the states rewrites them in place, so views handed out
+    (e.g. to an animation) stay valid
+    '''
+    def __init__(self,steps) -> None:
+        steps=np.asarray(steps)
+        if steps.ndim!=1 or len(steps)==0: raise ValueError("steps must be a non-empty 1D array")
+        self.__steps=steps
+        self.__states=np.zeros((len(steps),2,2),dtype=complex)
+        self.__traces=np.zeros((len(steps),3),dtype=complex)
+        self.__bloch=np.zeros((len(steps),3))
+        self.__stale=True
+
+    @classmethod
+    def from_channel(cls,channel: KrausChannel,rho,steps) -> "Trajectory":
+        '''
+        Returns the trajectory of rho under n applications of a single-qubit channel, for every n in steps
+        '''
+        if channel.get_dim()!=2: raise ValueError("Trajectories are single-qubit: the channel must act on dimension 2")
+        trajectory=cls(steps)
+        trajectory.set_states(channel.trajectory(rho,steps))
+        return trajectory
+
+    @classmethod
+    def load(cls,path: str) -> "Trajectory":
+        '''
+        Returns a trajectory written by save
+        '''
+        with np.load(path) as data:
+            trajectory=cls(data["steps"])
+            trajectory.set_states(data["states"])
+        return trajectory
+
+    def __len__(self) -> int:
+        return len(self.__steps)
+
+    def set_states(self,states) -> None:
+        '''
+        Overwrites the state buffer in place with a (T, 2, 2) array
+        '''
+        states=np.asarray(states)
+        if states.shape!=self.__states.shape: raise ValueError(f"Expected states of shape {self.__states.shape}, got {states.shape}")
+        self.__states[...]=states
+        self.__stale=True
+
+    def get_steps(self) -> np.ndarray:
+        return self.__steps
+
+    def get_states(self) -> np.ndarray:
+        return self.__states
+
+    def get_bloch(self) -> np.ndarray:
+        '''
+        Returns the (T, 3) Bloch vectors, recomputed into the same buffer only after the states change
+        '''
+        if self.__stale:
+            np.copyto(self.__bloch,bloch_sphere(self.__states,out=self.__traces))
+            self.__stale=False
+        return self.__bloch
+
+    def save(self,path: str) -> None:
+        '''
+        Writes steps, states and Bloch vectors to a .npz archive
+        '''
+        np.savez(path,steps=self.__steps,states=self.__states,bloch=self.get_bloch())
@@ -1,8 +1,13 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-from scipy.special import gammaln  # stable log-factorial
+
+from photontags.binning import DEAD_TIME, bin_counts
+from photontags.moments import CountAccumulator
+from photontags.pyramid import CountPyramid
+from photontags.tagarchive import CSV_CHANNEL, open_archive
+from photontags.timetags import files
+from pkg.countfit import fit_all, log_pmf, select
 
 
 # === Configuration ===
@@ -16,86 +21,75 @@ NAMES = [
 MACHINE_UNIT = 81e-12          # seconds per machine unit
 BIN = 10e-6                     # 1 ms window
 MACHINE_BIN = BIN / MACHINE_UNIT  # window in machine units
+SCAN_FACTORS = range(1, 31)     # Fano factor scan over windows of 1..30 BIN
 
 
-# === Distribution Models ===
-def poisson_model(k, lamb, scale):
-    """Numerically stable Poisson model with adjustable λ and scale."""
-    log_p = k * np.log(lamb) - lamb - gammaln(k + 1)
-    return scale * np.exp(log_p)
+# === Fit models ===
+LABELS = {
+    "poisson": ("Poisson fit", "crimson"),
+    "thermal": ("Thermal fit", "darkorange"),
+    "negbin": ("Multimode thermal fit", "seagreen"),
+    "poisson_thermal": ("Poisson ⊗ thermal fit", "purple"),
+}
 
 
-def thermal_model(k, mean, scale):
-    """Thermal (Bose–Einstein) model with adjustable mean and scale."""
-    return scale * (mean ** k) / ((1 + mean) ** (k + 1))
+# === Fano factor vs window ===
+def plot_fano_scan(scan: dict, name: str) -> None:
+    """Plot the Fano factor of every pyramid level against its window width."""
+    windows = scan["factor"] * BIN * 1e6
+    plt.figure(figsize=(8, 5))
+    plt.plot(windows, scan["fano"], "o-", color="steelblue", label="Experimental data")
+    plt.axhline(1, color="crimson", ls="--", lw=1.5, label="Poisson")
+    plt.xlabel(r"Window ($\mu s$)")
+    plt.ylabel("Fano factor")
+    plt.grid(True, ls="--", lw=0.5, alpha=0.7)
+    plt.legend()
+    plt.tight_layout()
+
+    os.makedirs("latex/Graphs", exist_ok=True)
+    plt.savefig(f"latex/Graphs/{name}_fano_window.png", dpi=300)
+    plt.close()
 
 
 # === Main fitting routine ===
 def hey(folder: str, name: str) -> None:
-    entries = os.listdir(folder)
-    counts_all = []
-
-    for entry in entries:
-        print(f"Parsing entry: {entry}")
-        file_path = os.path.join(folder, entry)
-
-        with open(file_path, mode="r", encoding="utf-8") as f:
-            lines = f.readlines()[1:]  # skip header
-
-        timestamps = [int(line.strip().split(",")[0]) for line in lines]
-        origin = timestamps[0]
-        timestamps = [t - origin for t in timestamps]
-
-        # Bin photon counts
-        i = 1
-        start = 0
-        bin_count = 1
-
-        while i < len(timestamps):
-            # Skip short separations (detector dead time)
-            if timestamps[i] - timestamps[i - 1] < 3900:
-                i += 1
-                continue
-
-            if timestamps[i] < (start + MACHINE_BIN):
-                bin_count += 1
-            else:
-                counts_all.append(bin_count)
-                bin_count = 1
-                start += MACHINE_BIN
-                while timestamps[i] > (start + MACHINE_BIN):
-                    counts_all.append(0)
-                    start += MACHINE_BIN
-            i += 1
-
-        counts_all.append(bin_count)
+    stats = CountAccumulator()
+    pyramid = CountPyramid(SCAN_FACTORS)
+
+    for file_path in files(folder):
+        print(f"Parsing entry: {os.path.basename(file_path)}")
+        timestamps = open_archive(file_path, "csv").tags(CSV_CHANNEL)
+
+        # Bin photon counts, skipping short separations (detector dead time)
+        counts = bin_counts(timestamps, MACHINE_BIN, DEAD_TIME)
+        stats.add(counts)
+        pyramid.feed(counts)
+        pyramid.flush()
+
+    plot_fano_scan(pyramid.result(), name)
 
     # === Statistics ===
-    counts_all = np.array(counts_all)
-    mean = np.mean(counts_all)
-    var = np.var(counts_all)
+    mean = stats.mean()
+    var = stats.var()
     fano = var / mean
-    print(f"[{name}] Mean={mean:.3f}, Var={var:.3f}, Fano={fano:.3f}")
+    print(f"[{name}] Mean={mean:.3f}, Var={var:.3f}, Fano={fano:.3f}, g2(0)={stats.g2():.4f}")
 
     # === Histogram ===
-    values, bin_edges = np.histogram(counts_all, bins=np.arange(np.max(counts_all) + 2))
-    bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
-
-    # === Fit using curve_fit ===
-    if "static" in name.lower():
-        popt, _ = curve_fit(poisson_model, bin_centers, values, p0=[mean, np.sum(values)], maxfev=10000)
-        lamb_fit, scale_fit = popt
-        model_fit = poisson_model(bin_centers, lamb_fit, scale_fit)
-        label = f"Poisson fit"
-        color = "crimson"
-        use_log_scale = False
-    else:
-        popt, _ = curve_fit(thermal_model, bin_centers, values, p0=[mean, np.sum(values)], maxfev=10000)
-        mean_fit, scale_fit = popt
-        model_fit = thermal_model(bin_centers, mean_fit, scale_fit)
-        label = f"Thermal fit"
-        color = "darkorange"
-        use_log_scale = True
+    values = stats.hist
+    bin_centers = np.arange(len(values)) + 0.5
+
+    # === Maximum-likelihood fits, model chosen by AIC ===
+    fits = fit_all(values)
+    choice = select(fits)
+    for model, fit in fits.items():
+        params = ", ".join(f"{p}={v:.4g}±{fit['errors'][p]:.2g}" for p, v in fit["params"].items())
+        print(f"[{name}] {model}: {params}, AIC={fit['aic']:.1f}, weight={choice['weights'][model]:.3f}")
+    for (null, alt), (stat, p) in choice["lr"].items():
+        print(f"[{name}] LR {null} vs {alt}: {stat:.2f} (p={p:.3g})")
+    best = str(choice["best"])
+    model_fit = np.exp(log_pmf(best, fits[best]["params"], np.arange(len(values))))
+    label, color = LABELS[best]
+    use_log_scale = best != "poisson"
 
     # === Normalize for probability comparison ===
     values_norm = values / np.sum(values)
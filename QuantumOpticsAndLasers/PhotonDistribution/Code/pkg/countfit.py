@@ -0,0 +1,246 @@
+import numpy as np
+from scipy.signal import lfilter
+from scipy.special import gammaln, xlogy
+from scipy.stats import chi2
+
+MODELS = ("poisson", "thermal", "negbin", "poisson_thermal")
+ITERATIONS = 100     # Newton / scoring steps before giving up
+TOL = 1e-10          # relative parameter change at convergence
+FLOOR = 1e-12        # lower bound of the Poisson⊗thermal means
+TAIL = 20            # Poisson⊗thermal support extends this many standard deviations past the mean
+
+
+def as_histograms(hist) -> tuple:
+    """((datasets, counts) array, shape of the per-dataset results) from one histogram, a 2D stack or a
+    list of histograms of any length."""
+    if isinstance(hist, (list, tuple)) and len(hist) and np.ndim(hist[0]) == 1:
+        out = np.zeros((len(hist), max(len(h) for h in hist)), dtype=np.int64)
+        for i, h in enumerate(hist):
+            out[i, :len(h)] = h
+        return out, (len(hist),)
+    hist = np.asarray(hist)
+    if hist.ndim not in (1, 2):
+        raise ValueError("expected one histogram or a stack of histograms")
+    return np.atleast_2d(hist), hist.shape[:-1]
+
+
+def _sufficient(hist: np.ndarray) -> tuple:
+    k = np.arange(hist.shape[1])
+    n = hist.sum(axis=1)
+    if np.any(n == 0):
+        raise ValueError("every histogram needs at least one bin count")
+    mean = hist @ k / n
+    var = hist @ (k * k) / n - mean ** 2
+    return k, n, mean, var
+
+
+def log_pmf(model: str, params: dict, k: np.ndarray) -> np.ndarray:
+    """log P(k) of a fitted model, shape (datasets, len(k))."""
+    k = np.asarray(k)
+    if model == "poisson":
+        lam = np.asarray(params["mean"])[..., None]
+        return xlogy(k, lam) - lam - gammaln(k + 1)
+    if model == "thermal":
+        mu = np.asarray(params["mean"])[..., None]
+        return xlogy(k, mu) - (k + 1) * np.log1p(mu)
+    if model == "negbin":
+        mu = np.asarray(params["mean"])[..., None]
+        modes = np.asarray(params["modes"], dtype=np.float64)[..., None]
+        finite = np.isfinite(modes)
+        m = np.where(finite, modes, 1.0)
+        nb = gammaln(k + m) - gammaln(m) - gammaln(k + 1) + xlogy(k, mu / (m + mu)) - m * np.log1p(mu / m)
+        return np.where(finite, nb, xlogy(k, mu) - mu - gammaln(k + 1))
+    if model == "poisson_thermal":
+        p = _mixture(np.atleast_1d(params["coherent"]), np.atleast_1d(params["thermal"]), int(np.max(k)) + 1)[0]
+        with np.errstate(divide="ignore"):
+            return np.log(p[..., k]).reshape(np.shape(params["coherent"]) + (len(k),))
+    raise ValueError(f"unknown model {model!r}, expected one of {MODELS}")
+
+
+def _loglik(hist: np.ndarray, logp: np.ndarray) -> np.ndarray:
+    # empty bins contribute nothing, whatever their probability
+    return np.sum(hist * np.where(hist > 0, logp, 0.0), axis=1)
+
+
+def _result(model: str, params: dict, errors: dict, loglik: np.ndarray, shape: tuple, converged=None) -> dict:
+    fit = {
+        "model": model,
+        "params": {p: v.reshape(shape)[()] for p, v in params.items()},
+        "errors": {p: v.reshape(shape)[()] for p, v in errors.items()},
+        "loglik": loglik.reshape(shape)[()],
+        "aic": (2 * len(params) - 2 * loglik).reshape(shape)[()],
+        "n_params": len(params),
+    }
+    if converged is not None:
+        fit["converged"] = converged.reshape(shape)[()]
+    return fit
+
+
+def fit_poisson(hist) -> dict:
+    """Poisson: the maximum-likelihood mean is the sample mean."""
+    hist, shape = as_histograms(hist)
+    k, n, mean, _ = _sufficient(hist)
+    loglik = _loglik(hist, log_pmf("poisson", {"mean": mean}, k))
+    return _result("poisson", {"mean": mean}, {"mean": np.sqrt(mean / n)}, loglik, shape)
+
+
+def fit_thermal(hist) -> dict:
+    """Single-mode thermal (Bose–Einstein): the maximum-likelihood mean is the sample mean."""
+    hist, shape = as_histograms(hist)
+    k, n, mean, _ = _sufficient(hist)
+    loglik = _loglik(hist, log_pmf("thermal", {"mean": mean}, k))
+    return _result("thermal", {"mean": mean}, {"mean": np.sqrt(mean * (1 + mean) / n)}, loglik, shape)
+
+
+def _negbin_score(hist: np.ndarray, n: np.ndarray, mean: np.ndarray, m: np.ndarray) -> tuple:
+    """Profile score in M and its derivative. For integer k, digamma(k + M) - digamma(M) is the sum of
+    1 / (M + j) over j < k; summing it directly avoids the cancellation of the digamma difference."""
+    j = np.arange(hist.shape[1] - 1)
+    tail = hist[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]     # bins with k > j
+    score = np.sum(tail / (m[:, None] + j), axis=1) - n * np.log1p(mean / m)
+    slope = -np.sum(tail / (m[:, None] + j) ** 2, axis=1) + n * (1 / m - 1 / (m + mean))
+    return score, slope
+
+
+def fit_negbin(hist, iterations: int = ITERATIONS, tol: float = TOL) -> dict:
+    """Multimode thermal (negative binomial) with mean and number of modes M.
+
+    The mean is the sample mean and is orthogonal to M, whose profile score is solved by Newton steps in
+    log M. Under-dispersed data (variance <= mean) has no finite maximum: M is inf, i.e. the Poisson limit.
+    """
+    hist, shape = as_histograms(hist)
+    k, n, mean, var = _sufficient(hist)
+    over = var > mean
+    modes = np.where(over, mean ** 2 / np.where(over, var - mean, 1.0), np.inf)
+    converged = ~over
+    m = np.where(over, modes, 1.0)
+    for _ in range(iterations):
+        score, slope = _negbin_score(hist, n, mean, m)
+        # Newton step in log M, bounded so a poor start cannot overshoot
+        step = np.clip(-score / (m * slope), -2.0, 2.0)
+        step[converged] = 0.0
+        m = m * np.exp(step)
+        converged |= np.abs(step) < tol
+        if np.all(converged):
+            break
+    modes = np.where(over, m, np.inf)
+    info = -_negbin_score(hist, n, mean, m)[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        modes_err = np.where(over, 1 / np.sqrt(info), np.inf)
+        mean_err = np.sqrt((mean + mean ** 2 / modes) / n)
+    params = {"mean": mean, "modes": modes}
+    loglik = _loglik(hist, log_pmf("negbin", params, k))
+    return _result("negbin", params, {"mean": mean_err, "modes": modes_err}, loglik, shape, converged)
+
+
+def _mixture(lam: np.ndarray, mu: np.ndarray, size: int) -> tuple:
+    """P(k) of Poisson(lam) ⊗ thermal(mu) on 0..size-1 and its derivatives in lam and mu."""
+    k = np.arange(size)
+    a = np.exp(xlogy(k, lam[:, None]) - lam[:, None] - gammaln(k + 1))
+    q = mu / (1 + mu)
+    p = np.empty_like(a)
+    c = np.empty_like(a)
+    for d in range(len(a)):
+        # the thermal pmf is geometric, (1 - q) q^k, so convolving with it is the recursion
+        # p(k) = q p(k-1) + (1 - q) a(k): O(size) and, unlike an FFT convolution, every term stays positive
+        p[d] = lfilter([1 - q[d]], [1, -q[d]], a[d])
+        # a ⊗ k q^k, the double-pole filter that carries d/dmu of the thermal pmf
+        c[d] = lfilter([0, q[d]], [1, -2 * q[d], q[d] ** 2], a[d])
+    dmu = c / (mu * (1 + mu) ** 2)[:, None] - p / (1 + mu)[:, None]
+    # d/dlam of a Poisson term is P(k-1) - P(k), and the convolution carries it over unchanged
+    dlam = np.concatenate((np.zeros((len(p), 1)), p[:, :-1]), axis=1) - p
+    return p, dlam, dmu
+
+
+def fit_poisson_thermal(hist, iterations: int = ITERATIONS, tol: float = TOL) -> dict:
+    """Coherent ⊗ single-mode thermal light: Poisson(coherent) convolved with Bose–Einstein(thermal).
+
+    Both means are found by Fisher scoring from the moment estimates; the expected information is summed
+    over a support reaching TAIL standard deviations past the largest mean.
+    """
+    hist, shape = as_histograms(hist)
+    k, n, mean, var = _sufficient(hist)
+    size = max(hist.shape[1], int(np.max(mean + TAIL * np.sqrt(var + 1))) + 1)
+    h = np.zeros((len(hist), size))
+    h[:, :hist.shape[1]] = hist
+    mu = np.sqrt(np.maximum(var - mean, 0.0))
+    theta = np.stack((np.maximum(mean - mu, FLOOR), np.maximum(mu, FLOOR)), axis=1)
+    converged = np.zeros(len(hist), dtype=bool)
+    for _ in range(iterations):
+        p, dlam, dmu = _mixture(theta[:, 0], theta[:, 1], size)
+        grad = np.stack((dlam, dmu), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(p[:, None, :] > 0, grad / p[:, None, :], 0.0)
+        score = np.einsum("dk,dak->da", h, ratio)
+        info = n[:, None, None] * np.einsum("dak,dbk->dab", ratio, grad)
+        # at thermal = 0 both means shift P(k) alike to first order and the information is singular
+        step = np.einsum("dab,db->da", np.linalg.pinv(info), score)
+        step[converged] = 0.0
+        new = np.maximum(theta + step, FLOOR)
+        converged |= np.all(np.abs(new - theta) <= tol * np.maximum(theta, 1.0), axis=1)
+        theta = new
+        if np.all(converged):
+            break
+    p, dlam, dmu = _mixture(theta[:, 0], theta[:, 1], size)
+    grad = np.stack((dlam, dmu), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(p[:, None, :] > 0, grad / p[:, None, :], 0.0)
+        info = n[:, None, None] * np.einsum("dak,dbk->dab", ratio, grad)
+        cov = np.linalg.pinv(info)
+        logp = np.log(p)
+    params = {"coherent": theta[:, 0], "thermal": theta[:, 1]}
+    errors = {"coherent": np.sqrt(cov[:, 0, 0]), "thermal": np.sqrt(cov[:, 1, 1])}
+    return _result("poisson_thermal", params, errors, _loglik(h, logp), shape, converged)
+
+
+FITS = {
+    "poisson": fit_poisson,
+    "thermal": fit_thermal,
+    "negbin": fit_negbin,
+    "poisson_thermal": fit_poisson_thermal,
+}
+
+# (simpler, richer, extra parameters, simpler sits on the boundary of the richer model's parameter space)
+NESTED = (
+    ("poisson", "negbin", 1, True),
+    ("poisson", "poisson_thermal", 1, True),
+    ("thermal", "negbin", 1, False),
+)
+
+
+def likelihood_ratio(null: dict, alt: dict, df: int = 1, boundary: bool = False) -> tuple:
+    """(statistic, p-value) of the nested model `null` against `alt`.
+
+    On a boundary (e.g. M = inf, thermal = 0) the statistic follows an even mixture of 0 and chi2(df).
+    """
+    stat = np.maximum(2 * (np.asarray(alt["loglik"]) - np.asarray(null["loglik"])), 0.0)
+    p = chi2.sf(stat, df)
+    return stat, 0.5 * p if boundary else p
+
+
+def fit_all(hist, models=MODELS) -> dict:
+    """{model: fit} for every model in models; hist may hold many datasets, fitted at once."""
+    for model in models:
+        if model not in FITS:
+            raise ValueError(f"unknown model {model!r}, expected one of {MODELS}")
+    return {model: FITS[model](hist) for model in models}
+
+
+def select(fits: dict) -> dict:
+    """Lowest-AIC model per dataset, with AIC weights and the likelihood-ratio tests of nested pairs."""
+    names = list(fits)
+    aic = np.stack([np.asarray(fits[m]["aic"], dtype=np.float64) for m in names])
+    delta = aic - aic.min(axis=0)
+    weights = np.exp(-delta / 2)
+    weights /= weights.sum(axis=0)
+    best = np.array(names)[np.argmin(aic, axis=0)]
+    tests = {
+        (a, b): likelihood_ratio(fits[a], fits[b], df, boundary)
+        for a, b, df, boundary in NESTED if a in fits and b in fits
+    }
+    return {
+        "best": best,
+        "aic": {m: fits[m]["aic"] for m in names},
+        "weights": {m: w[()] for m, w in zip(names, weights)},
+        "lr": tests,
+    }
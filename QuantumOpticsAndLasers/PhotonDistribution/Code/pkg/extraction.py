@@ -0,0 +1,195 @@
+import os
+import time
+import numpy as np
+from scipy import fft
+
+from photontags.binning import DEAD_TIME
+from photontags.tagarchive import CSV_CHANNEL, open_archive
+from photontags.timetags import files
+
+METHODS = ("raw", "vonneumann", "toeplitz")
+TOEPLITZ_IN = 4096      # raw bits hashed per Toeplitz block
+MIN_ENTROPY = 0.9       # min-entropy per raw bit assumed when sizing the Toeplitz output
+EPSILON = 2.0 ** -64    # distance from uniform allowed by the leftover hash lemma
+SEED = 0                # public seed of the Toeplitz matrix
+REPORT = 5.0            # seconds between progress lines
+
+
+class IntervalBits:
+    """Comparison bits of consecutive inter-arrival intervals, 1 when an interval is not shorter than the next.
+
+    Intervals of min_gap ticks or less are dropped first. The last timestamp and the last kept interval are
+    carried across chunks, so chunked feeds give the bits of the whole acquisition.
+    """
+
+    def __init__(self, min_gap: int = DEAD_TIME) -> None:
+        self._min_gap = min_gap
+        self._last_ts = None
+        self._last_diff = None
+
+    def feed(self, ts: np.ndarray) -> np.ndarray:
+        if len(ts) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        diffs = np.diff(ts) if self._last_ts is None else np.diff(ts, prepend=self._last_ts)
+        self._last_ts = ts[-1]
+        diffs = diffs[diffs > self._min_gap]
+        if self._last_diff is not None:
+            diffs = np.concatenate(([self._last_diff], diffs))
+        if len(diffs) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        self._last_diff = diffs[-1]
+        return (diffs[:-1] >= diffs[1:]).astype(np.uint8)
+
+
+class VonNeumann:
+    """Von Neumann debiasing: of each non-overlapping bit pair, 01 gives 0, 10 gives 1, 00 and 11 nothing."""
+
+    def __init__(self) -> None:
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    def feed(self, bits: np.ndarray) -> np.ndarray:
+        bits = np.concatenate((self._carry, bits))
+        n = len(bits) // 2 * 2
+        self._carry = bits[n:]
+        pairs = bits[:n].reshape(-1, 2)
+        return pairs[pairs[:, 0] != pairs[:, 1], 0]
+
+
+def toeplitz_length(n_in: int, min_entropy: float = MIN_ENTROPY, epsilon: float = EPSILON) -> int:
+    """Output bits of a Toeplitz hash of n_in raw bits, by the leftover hash lemma."""
+    n_out = int(np.floor(n_in * min_entropy - 2 * np.log2(1 / epsilon)))
+    if n_out < 1:
+        raise ValueError("block too short for the requested min-entropy and epsilon")
+    return n_out
+
+
+class Toeplitz:
+    """Toeplitz hashing of n_in-bit blocks into n_out bits, all complete blocks of a chunk at once.
+
+    The matrix T[i, j] = seed[i - j + n_in - 1] is never formed: T @ x is a slice of the convolution of
+    the seed with x, computed with one batched FFT and reduced mod 2. A circular convolution of length
+    n_in + n_out - 1 already leaves that slice free of wrap-around. Incomplete blocks wait for the next chunk.
+    """
+
+    def __init__(self, n_in: int = TOEPLITZ_IN, n_out: int = None, seed: int = SEED) -> None:
+        self._n_in = n_in
+        self._n_out = toeplitz_length(n_in) if n_out is None else n_out
+        if not 0 < self._n_out <= n_in:
+            raise ValueError("n_out must lie in [1, n_in]")
+        self._fft_size = fft.next_fast_len(n_in + self._n_out - 1, real=True)
+        seed_bits = np.random.default_rng(seed).integers(0, 2, n_in + self._n_out - 1)
+        self._seed = fft.rfft(seed_bits, self._fft_size)
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    def feed(self, bits: np.ndarray) -> np.ndarray:
+        bits = np.concatenate((self._carry, bits))
+        n = len(bits) // self._n_in * self._n_in
+        self._carry = bits[n:]
+        if n == 0:
+            return np.zeros(0, dtype=np.uint8)
+        blocks = bits[:n].reshape(-1, self._n_in)
+        spectrum = fft.rfft(blocks, self._fft_size, axis=1, workers=-1) * self._seed
+        conv = fft.irfft(spectrum, self._fft_size, axis=1, workers=-1)
+        out = conv[:, self._n_in - 1:self._n_in - 1 + self._n_out]
+        return (np.rint(out).astype(np.int64) & 1).astype(np.uint8).ravel()
+
+
+class Raw:
+    """No extraction: the comparison bits as they are."""
+
+    def feed(self, bits: np.ndarray) -> np.ndarray:
+        return bits
+
+
+class MinEntropy:
+    """Running most-common-value min-entropy estimate (NIST SP 800-90B, 6.3.1) of bits taken as bytes."""
+
+    def __init__(self) -> None:
+        self._hist = np.zeros(256, dtype=np.int64)
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    def feed(self, bits: np.ndarray) -> None:
+        bits = np.concatenate((self._carry, bits))
+        n = len(bits) // 8 * 8
+        self._carry = bits[n:]
+        self._hist += np.bincount(np.packbits(bits[:n]), minlength=256)
+
+    def estimate(self) -> float:
+        """Min-entropy per bit, from the 99% upper bound on the probability of the most common byte."""
+        n = self._hist.sum()
+        if n < 2:
+            return np.nan
+        p = self._hist.max() / n
+        upper = min(1.0, p + 2.576 * np.sqrt(p * (1 - p) / (n - 1)))
+        return -np.log2(upper) / 8
+
+
+class BitWriter:
+    """Pack bits into bytes and append them to a binary file; fewer than 8 bits left at close are dropped."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "wb")
+        self._carry = np.zeros(0, dtype=np.uint8)
+        self.bytes = 0
+
+    def write(self, bits: np.ndarray) -> None:
+        bits = np.concatenate((self._carry, bits))
+        n = len(bits) // 8 * 8
+        self._carry = bits[n:]
+        np.packbits(bits[:n]).tofile(self._file)
+        self.bytes += n // 8
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def extractor(method: str, min_entropy: float = MIN_ENTROPY, n_in: int = TOEPLITZ_IN, seed: int = SEED):
+    if method == "raw":
+        return Raw()
+    if method == "vonneumann":
+        return VonNeumann()
+    if method == "toeplitz":
+        return Toeplitz(n_in, toeplitz_length(n_in, min_entropy), seed)
+    raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+
+
+def generate(source, dest: str, method: str = "toeplitz", fmt: str = "csv", channel: int = CSV_CHANNEL,
+             min_gap: int = DEAD_TIME, min_entropy: float = MIN_ENTROPY, n_in: int = TOEPLITZ_IN, seed: int = SEED,
+             report: float = REPORT) -> dict:
+    """Stream the time tags of every file in source through comparison bits and an extractor into dest.
+
+    Each file is an independent acquisition: intervals never span two files. Prints the sustained output
+    bit rate and the running min-entropy estimate of the raw bits every `report` seconds.
+    """
+    ext = extractor(method, min_entropy, n_in, seed)
+    entropy = MinEntropy()
+    writer = BitWriter(dest)
+    raw = 0
+    start = last = time.perf_counter()
+    try:
+        for path in files(source):
+            intervals = IntervalBits(min_gap)
+            for ts in open_archive(path, fmt).iter_blocks(channel):
+                bits = intervals.feed(ts)
+                entropy.feed(bits)
+                writer.write(ext.feed(bits))
+                raw += len(bits)
+                now = time.perf_counter()
+                if now - last >= report:
+                    last = now
+                    print(f"{os.path.basename(path)}: {raw} raw bits, {8 * writer.bytes} out, "
+                          f"{8 * writer.bytes / (now - start) / 1e6:.1f} Mbit/s, H_min={entropy.estimate():.4f} bit/bit")
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+    h = entropy.estimate()
+    if method == "toeplitz" and h < min_entropy:
+        print(f"Warning: measured min-entropy {h:.4f} bit/bit is below the assumed {min_entropy}")
+    return {
+        "raw_bits": raw,
+        "bits": 8 * writer.bytes,
+        "bytes": writer.bytes,
+        "seconds": seconds,
+        "rate": 8 * writer.bytes / seconds if seconds else np.nan,
+        "min_entropy": h,
+    }
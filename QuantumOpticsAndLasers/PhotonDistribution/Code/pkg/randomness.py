@@ -0,0 +1,242 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.special import erfc
+from scipy.stats import chi2
+
+ALPHA = 0.01                        # significance level of every test
+BLOCK_BITS = 128                    # block frequency test block length (a whole number of bytes)
+LAGS = (1, 2, 3, 4, 5, 6, 7, 8, 16)  # autocorrelation lags in bits
+SERIAL = 3                          # serial test pattern length
+APEN = 4                            # approximate entropy pattern length
+CHUNK = 2**24                       # bytes scanned at once
+MIN_SLICE = 2**20                   # smallest byte range handed to a worker
+SLICES_PER_WORKER = 4
+
+PAIRS = np.arange(65536)            # byte i << 8 | byte i + 1
+# 8-bit window starting r bits into byte i, for r = 0..7
+WINDOWS = np.concatenate([(PAIRS >> (8 - r)) & 0xFF for r in range(8)])
+# differing bit pairs at lag d < 8 among the pairs starting in byte i
+SHORT_XOR = {d: np.bitwise_count((PAIRS >> 8) ^ ((PAIRS >> (8 - d)) & 0xFF)) for d in range(1, 8)}
+
+
+class Battery:
+    """Monobit, runs, block frequency, autocorrelation, serial, approximate entropy and byte χ² tests on a
+    byte stream, fed chunk by chunk in bounded memory.
+
+    Bits are read MSB first. Each byte is scanned once, through the histogram of (byte, next byte) pairs that
+    yields every overlapping 8-bit window and the short-lag XOR counts; the last bytes lacking lookahead are
+    held back and resolved by the next chunk, by merge() or by finish(). A Battery built with `offset` covers
+    the stream from that byte on, so batteries of adjacent byte ranges merge into the whole.
+    """
+
+    def __init__(self, offset: int = 0, lags=LAGS, block_bits: int = BLOCK_BITS) -> None:
+        if block_bits % 8:
+            raise ValueError("block_bits must be a whole number of bytes")
+        if max(SERIAL, APEN + 1) > 8:
+            raise ValueError("pattern lengths above 8 bits are not supported")
+        self._offset = offset
+        self._lags = tuple(sorted(lags))
+        self._block = block_bits // 8
+        self._reach = self._lags[-1] // 8 + 1      # lookahead bytes
+        self._head = np.zeros(0, dtype=np.uint8)
+        self._pending = np.zeros(0, dtype=np.uint8)
+        self._done = 0                             # bytes scanned
+        self._windows = np.zeros(256, dtype=np.int64)
+        self._tail = {k: np.zeros(2 ** k, dtype=np.int64) for k in range(1, 9)}
+        self._xor = dict.fromkeys(self._lags, 0)
+        self._bytes = np.zeros(256, dtype=np.int64)
+        self._blocks = 0
+        self._block_chi = 0.0
+        self._partial = {}                          # block id: [ones, bytes] of blocks not yet complete
+        self._finished = False
+
+    def _add_blocks(self, data: np.ndarray) -> None:
+        pos = self._offset + self._done
+        first = min(-pos % self._block, len(data))
+        if first:
+            self._add_partial(pos // self._block, int(np.bitwise_count(data[:first]).sum()), first)
+        body = data[first:]
+        full = len(body) // self._block * self._block
+        if full:
+            ones = np.bitwise_count(body[:full]).reshape(-1, self._block).sum(axis=1, dtype=np.int64)
+            self._blocks += len(ones)
+            self._block_chi += 4 * 8 * self._block * float(np.sum((ones / (8 * self._block) - 0.5) ** 2))
+        if full < len(body):
+            rest = body[full:]
+            self._add_partial((pos + first + full) // self._block, int(np.bitwise_count(rest).sum()), len(rest))
+
+    def _add_partial(self, block: int, ones: int, size: int) -> None:
+        entry = self._partial.setdefault(block, [0, 0])
+        entry[0] += ones
+        entry[1] += size
+        if entry[1] == self._block:
+            del self._partial[block]
+            self._blocks += 1
+            self._block_chi += 4 * 8 * self._block * (entry[0] / (8 * self._block) - 0.5) ** 2
+
+    def _scan(self, buf: np.ndarray, n: int) -> None:
+        """Every statistic of the bits starting in buf[:n]; buf holds at least `reach` bytes more."""
+        head = buf[:n]
+        pairs = np.bincount((head.astype(np.uint16) << 8) | buf[1:n + 1], minlength=65536)
+        self._windows += np.bincount(WINDOWS, weights=np.tile(pairs, 8), minlength=256).astype(np.int64)
+        self._bytes += pairs.reshape(256, 256).sum(axis=1)
+        for d in self._lags:
+            q, r = divmod(d, 8)
+            if q == 0:
+                self._xor[d] += int(pairs @ SHORT_XOR[d])
+                continue
+            shifted = buf[q:n + q] if r == 0 else (buf[q:n + q] << r) | (buf[q + 1:n + q + 1] >> (8 - r))
+            self._xor[d] += int(np.bitwise_count(head ^ shifted).sum(dtype=np.int64))
+        self._add_blocks(head)
+        self._done += n
+
+    def feed(self, data: np.ndarray) -> None:
+        """Append the next bytes of the stream."""
+        if self._finished:
+            raise ValueError("battery already finished")
+        data = np.asarray(data, dtype=np.uint8)
+        if len(self._head) < self._reach:
+            self._head = np.concatenate((self._head, data[:self._reach - len(self._head)]))
+        buf = np.concatenate((self._pending, data))
+        n = len(buf) - self._reach
+        if n > 0:
+            self._scan(buf, n)
+            self._pending = buf[n:]
+        else:
+            self._pending = buf
+
+    def merge(self, other: "Battery") -> None:
+        """Append an unfinished battery of the byte range that starts where this one ends."""
+        if self._finished or other._finished:
+            raise ValueError("only unfinished batteries can be merged")
+        if other._offset != self._offset + self._done + len(self._pending):
+            raise ValueError("batteries must cover adjacent byte ranges, in order")
+        if other._done == 0:
+            self.feed(other._pending)
+            return
+        # the bytes held back here find their lookahead at the start of the other range
+        self._scan(np.concatenate((self._pending, other._head)), len(self._pending))
+        self._windows += other._windows
+        for d in self._lags:
+            self._xor[d] += other._xor[d]
+        self._bytes += other._bytes
+        self._blocks += other._blocks
+        self._block_chi += other._block_chi
+        for block, (ones, size) in other._partial.items():
+            self._add_partial(block, ones, size)
+        self._done += other._done
+        self._pending = other._pending
+
+    def finish(self) -> dict:
+        """Scan the held-back end of the stream and return result()."""
+        if not self._finished:
+            tail = self._pending
+            bits = np.unpackbits(tail)
+            for k in range(1, 9):
+                if len(bits) >= k:
+                    windows = np.lib.stride_tricks.sliding_window_view(bits, k)
+                    self._tail[k] += np.bincount(windows @ (1 << np.arange(k - 1, -1, -1)), minlength=2 ** k)
+            for d in self._lags:
+                if len(bits) > d:
+                    self._xor[d] += int(np.count_nonzero(bits[:-d] != bits[d:]))
+            self._bytes += np.bincount(tail, minlength=256)
+            self._add_blocks(tail)
+            self._done += len(tail)
+            self._pending = tail[:0]
+            self._finished = True
+        return self.result()
+
+    def _patterns(self, k: int) -> np.ndarray:
+        """Counts of the overlapping k-bit patterns of the whole stream (no wrap-around)."""
+        return self._windows.reshape(2 ** k, -1).sum(axis=1) + self._tail[k]
+
+    def result(self) -> dict:
+        """{test: {"statistic", "p", "passed"}}; autocorrelation tests are keyed by lag."""
+        if not self._finished:
+            raise ValueError("call finish() before reading the results")
+        n = 8 * self._done
+        if n < 64:
+            raise ValueError("too few bits to test")
+        tests = {}
+        ones = int(self._patterns(1)[1])
+        s = 2 * ones - n
+        tests["monobit"] = (s / np.sqrt(n), erfc(abs(s) / np.sqrt(2 * n)))
+
+        pi = ones / n
+        two = self._patterns(2)
+        runs = 1 + int(two[1] + two[2])
+        if abs(pi - 0.5) >= 2 / np.sqrt(n):
+            tests["runs"] = (runs, 0.0)
+        else:
+            tests["runs"] = (runs, erfc(abs(runs - 2 * n * pi * (1 - pi)) / (2 * np.sqrt(2 * n) * pi * (1 - pi))))
+
+        tests["block_frequency"] = (self._block_chi, chi2.sf(self._block_chi, self._blocks) if self._blocks else np.nan)
+
+        for d in self._lags:
+            z = (2 * self._xor[d] - (n - d)) / np.sqrt(n - d)
+            tests[f"autocorrelation_{d}"] = (z, erfc(abs(z) / np.sqrt(2)))
+
+        def psi2(k: int) -> float:
+            if k == 0:
+                return 0.0
+            counts = self._patterns(k)
+            total = counts.sum()
+            return 2 ** k / total * float(np.dot(counts, counts)) - total
+
+        m = SERIAL
+        d1 = psi2(m) - psi2(m - 1)
+        d2 = psi2(m) - 2 * psi2(m - 1) + psi2(m - 2)
+        tests["serial_1"] = (d1, chi2.sf(d1, 2 ** (m - 1)))
+        tests["serial_2"] = (d2, chi2.sf(d2, 2 ** (m - 2)))
+
+        def phi(k: int) -> float:
+            c = self._patterns(k)
+            c = c[c > 0] / c.sum()
+            return float(np.sum(c * np.log(c)))
+
+        apen = phi(APEN) - phi(APEN + 1)
+        stat = 2 * n * (np.log(2) - apen)
+        tests["approximate_entropy"] = (stat, chi2.sf(stat, 2 ** APEN))
+
+        expected = self._done / 256
+        stat = float(np.sum((self._bytes - expected) ** 2) / expected)
+        tests["byte_chi2"] = (stat, chi2.sf(stat, 255))
+
+        return {name: {"statistic": float(v), "p": float(p), "passed": bool(p >= ALPHA)} for name, (v, p) in tests.items()}
+
+
+def test_bytes(data: np.ndarray, lags=LAGS, block_bits: int = BLOCK_BITS) -> dict:
+    """Battery results of one in-memory byte buffer."""
+    battery = Battery(0, lags, block_bits)
+    for i in range(0, len(data), CHUNK):
+        battery.feed(data[i:i + CHUNK])
+    return battery.finish()
+
+
+def run_slice(job: tuple) -> Battery:
+    """Unfinished battery of bytes [start, stop) of a memory-mapped file."""
+    path, start, stop, lags, block_bits = job
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    battery = Battery(start, lags, block_bits)
+    for i in range(start, stop, CHUNK):
+        battery.feed(data[i:min(i + CHUNK, stop)])
+    return battery
+
+
+def test_file(path: str, workers: int = None, lags=LAGS, block_bits: int = BLOCK_BITS) -> dict:
+    """Battery results of a binary file, byte ranges scanned on a process pool and merged in order."""
+    size = os.path.getsize(path)
+    workers = workers or os.cpu_count()
+    slices = max(1, min(workers * SLICES_PER_WORKER, size // MIN_SLICE))
+    edges = np.linspace(0, size, slices + 1).astype(np.int64)
+    jobs = [(path, int(a), int(b), lags, block_bits) for a, b in zip(edges[:-1], edges[1:])]
+    if slices == 1:
+        parts = [run_slice(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_slice, jobs))
+    battery = parts[0]
+    for part in parts[1:]:
+        battery.merge(part)
+    return battery.finish()
@@ -3,45 +3,29 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
+from pkg.extraction import generate
+from pkg.randomness import test_file
+
 DATA_FOLDER = 'data/laser 633 nm with SPAD/Spinning wheel'
 MACHINE_UNIT = 81e-12  # 81 ps
 SKIP_SHORT_DIFF = 3900  # filter close timestamps if needed
-
-def extract_bits_from_timestamps(timestamps):
-    """Generate random bits based on difference comparisons."""
-    timestamps = np.array(timestamps, dtype=np.int64)
-    diffs = np.diff(timestamps)
-
-    # Optionally filter out unrealistically short intervals (dead-time, afterpulsing)
-    diffs = diffs[diffs > SKIP_SHORT_DIFF]
-
-    bits = (diffs[:-1] >= diffs[1:]).astype(np.uint8)  # 0 if D_i < D_i+1 else 1
-    return bits
-
-def bits_to_bytes(bits):
-    """Group bits into bytes (8 bits per value)."""
-    n_bytes = len(bits) // 8
-    bits = bits[:n_bytes * 8]
-    byte_values = np.packbits(bits)
-    return byte_values
+EXTRACTOR = "toeplitz"  # "raw", "vonneumann" or "toeplitz"
+MIN_ENTROPY = 0.9  # assumed min-entropy per raw bit, sets the Toeplitz output length
+OUTPUT = "QRNG_633nm_Thermal.bin"
+POINTS = 200000  # points drawn in the random fog
 
 def main():
-    all_bytes = []
-
-    for entry in os.listdir(DATA_FOLDER):
-        print(f"Processing file: {entry}")
-        file_name = os.path.join(DATA_FOLDER, entry)
-        with open(file_name, "r", encoding="utf-8") as f:
-            lines = f.readlines()[1:]
+    summary = generate(DATA_FOLDER, OUTPUT, EXTRACTOR, min_gap=SKIP_SHORT_DIFF, min_entropy=MIN_ENTROPY)
+    print(f"Generated {summary['bytes']} bytes of random data "
+          f"({summary['rate'] / 1e6:.1f} Mbit/s, raw min-entropy {summary['min_entropy']:.4f} bit/bit).")
 
-        timestamps = [int(line.strip().split(",")[0]) for line in lines]
-        bits = extract_bits_from_timestamps(timestamps)
-        byte_values = bits_to_bytes(bits)
-        all_bytes.append(byte_values)
+    # Validate the batch before it is used
+    results = test_file(OUTPUT)
+    for test, r in results.items():
+        print(f"{test:>22}: p={r['p']:.4f} {'PASS' if r['passed'] else 'FAIL'}")
+    print(f"Batch {'passed' if all(r['passed'] for r in results.values()) else 'FAILED'} the randomness battery.")
 
-    # Combine all byte sequences
-    all_bytes = np.concatenate(all_bytes)
-    print(f"Generated {len(all_bytes)} bytes of random data.")
+    all_bytes = np.memmap(OUTPUT, dtype=np.uint8, mode="r")[:3 * POINTS]
 
     # Group every 3 bytes into (x, y, z)
     n_points = len(all_bytes) // 3
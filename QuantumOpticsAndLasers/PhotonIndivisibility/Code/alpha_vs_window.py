@@ -1,8 +1,12 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-from tqdm import tqdm
 import csv
+from functools import partial
+
+from photontags.tagarchive import load
+from pkg.coincidence import TripleCoincidence, WindowScan
+from pkg.parallel import analyse
 
 # ======== CONFIG ========
 FILE1 = "data/TimeTags.txt"     # <-- your first file
@@ -19,84 +23,17 @@ os.makedirs(RESULT_DIR, exist_ok=True)
 # =========================
 
 
-class Event:
-    def __init__(self, ch: int, timestamp: int):
-        self._ch = ch
-        self._ts = timestamp
-
-    def get_ch(self): return self._ch
-    def get_timestamp(self): return self._ts
-    def offset(self, ticks: int): self._ts += ticks
-
-
 def load_events_from_file(file_path: str):
     """Load events from a single file and apply per-channel delay correction."""
-    events = []
     print(f"Reading {file_path}")
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()[6:]  # skip header lines if present
-
-    for line in lines:
-        timestamp, ch = line.split(";")
-        timestamp = int(timestamp.strip())
-        ch = int(ch.strip())
-        e = Event(ch, timestamp)
-
-        if ch == 1:
-            e.offset(DELAY_1_TICKS)
-        elif ch == 2:
-            e.offset(DELAY_2_TICKS)
-
-        events.append(e)
-
-    events.sort(key=lambda e: e.get_timestamp())
-    return events
-
-
-def events_by_channel(events, ch):
-    return [e for e in events if e.get_ch() == ch]
+    return load(file_path, delays={1: DELAY_1_TICKS, 2: DELAY_2_TICKS})
 
 
 def find_triple_coincidences(events, window_ticks):
     """Count coincidences between herald (ch3) and ch1, ch2 within ±window_ticks."""
-    her = events_by_channel(events, 3)
-    ch1_list = events_by_channel(events, 1)
-    ch2_list = events_by_channel(events, 2)
-
-    her_ts = np.array([h.get_timestamp() for h in her], dtype=np.int64)
-    ch1_ts = np.array([e.get_timestamp() for e in ch1_list], dtype=np.int64)
-    ch2_ts = np.array([e.get_timestamp() for e in ch2_list], dtype=np.int64)
-
-    n3 = len(her_ts)
-    n13 = n23 = n123 = 0
-    i1 = i2 = 0
-    N1, N2 = len(ch1_ts), len(ch2_ts)
-
-    for h_ts in her_ts:
-        while i1 < N1 and ch1_ts[i1] < h_ts - window_ticks:
-            i1 += 1
-        j1 = i1
-        ch1_hits = []
-        while j1 < N1 and ch1_ts[j1] <= h_ts + window_ticks:
-            ch1_hits.append(ch1_ts[j1])
-            j1 += 1
-
-        while i2 < N2 and ch2_ts[i2] < h_ts - window_ticks:
-            i2 += 1
-        j2 = i2
-        ch2_hits = []
-        while j2 < N2 and ch2_ts[j2] <= h_ts + window_ticks:
-            ch2_hits.append(ch2_ts[j2])
-            j2 += 1
-
-        if ch1_hits:
-            n13 += 1
-        if ch2_hits:
-            n23 += 1
-        if ch1_hits and ch2_hits:
-            n123 += 1
-
-    return {"n3": n3, "n13": n13, "n23": n23, "n123": n123}
+    engine = TripleCoincidence(window_ticks)
+    engine.feed(events)
+    return engine.finish()
 
 
 def compute_alpha(result):
@@ -106,28 +43,30 @@ def compute_alpha(result):
     return alpha, sigma
 
 
-def scan_alpha(file_path, max_ns=10):
-    """Scan α vs coincidence window and cache results."""
+def scan_engines(max_ticks):
+    return {"scan": WindowScan(max_ticks)}
+
+
+def scan_alpha(file_path, max_ns=10, step=1):
+    """Scan α vs coincidence window (step, 2*step, ..., max_ns) and cache results."""
     base = os.path.splitext(os.path.basename(file_path))[0]
     result_file = os.path.join(RESULT_DIR, f"{base}_alpha_vs_window.csv")
+    windows = np.arange(1, int(round(max_ns / step)) + 1) * step
 
-    # If results already exist, just load them
+    # If results for the same window grid already exist, just load them
     if os.path.exists(result_file):
-        print(f"Loading cached results from {result_file}")
-        data = np.loadtxt(result_file, delimiter=",", skiprows=1)
-        return data[:, 0], data[:, 1], data[:, 2]
+        data = np.loadtxt(result_file, delimiter=",", skiprows=1, ndmin=2)
+        if len(data) == len(windows) and np.allclose(data[:, 0], windows):
+            print(f"Loading cached results from {result_file}")
+            return data[:, 0], data[:, 1], data[:, 2]
 
     print(f"\n=== Processing {file_path} ===")
-    events = load_events_from_file(file_path)
-    windows = np.arange(1, max_ns + 1)
-    alphas, sigmas = [], []
-
-    for ns in tqdm(windows, desc="Scanning coincidence windows", unit="ns"):
-        window_ticks = int((ns * 1e-9) / CLOCK)
-        result = find_triple_coincidences(events, window_ticks)
-        alpha, sigma = compute_alpha(result)
-        alphas.append(alpha)
-        sigmas.append(sigma)
+    # one parallel pass over the archive: nearest-neighbour distance histograms answer every window at once
+    window_ticks = ((windows * 1e-9) / CLOCK).astype(np.int64)
+    factory = partial(scan_engines, int(window_ticks.max()))
+    engine = analyse(file_path, factory, delays={1: DELAY_1_TICKS, 2: DELAY_2_TICKS})["scan"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alphas, sigmas = compute_alpha(engine.result(window_ticks))
 
     # Save results to file
     with open(result_file, "w", newline="") as f:
@@ -137,7 +76,7 @@ def scan_alpha(file_path, max_ns=10):
             writer.writerow([w, a, s])
 
     print(f"Results saved to {result_file}")
-    return windows, np.array(alphas), np.array(sigmas)
+    return windows, alphas, sigmas
 
 
 def main():
@@ -1,14 +1,27 @@
 import os
+import numpy as np
+
+from photontags.tagarchive import TagArchive
+from photontags.timetags import ARCHIVE, files, iter_chunks
+
+
+def channel_counts(path):
+    """Tags per channel, read from an up-to-date archive if there is one, else streamed from the text without writing anything."""
+    dest=path+ARCHIVE
+    if os.path.exists(dest) and os.path.getmtime(dest)>=os.path.getmtime(path):
+        archive=TagArchive(dest)
+        return {c:archive.count(c) for c in archive.channels()}
+    counts={}
+    for ts,ch in iter_chunks(path):
+        for c,n in zip(*np.unique(ch,return_counts=True)):
+            counts[int(c)]=counts.get(int(c),0)+int(n)
+    return counts
+
 
 n_lines=[0,0,0,0]
-for entry in os.listdir("data"):
-    with open(os.path.join("data",entry),mode="r") as f:
-        lines=f.readlines()
-    lines=lines[6:]
-    n_lines[3]+=len(lines)
-    for line in lines:
-        ts,ch=line.split(";")
-        ts=ts.strip()
-        ch=int(ch.strip())
-        n_lines[ch-1]+=1
+for path in files("data"):
+    counts=channel_counts(path)
+    for c in range(1,4):
+        n_lines[c-1]+=counts.get(c,0)
+    n_lines[3]+=sum(counts.values())
 print(n_lines)
\ No newline at end of file
@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from photontags.tagarchive import WIDTH, iter_windows
+
+
+class StreamEngine(ABC):
+    """Buffer per-channel sorted streams and release reference events once every other channel is complete
+    up to `reach` ticks past them. Subclasses implement process(), merge() and result()."""
+
+    def __init__(self, reference: int, others: tuple, reach: int) -> None:
+        self._reference = reference
+        self._others = tuple(others)
+        self._reach = reach
+        self._buffers = {c: np.empty(0, dtype=np.int64) for c in (reference,) + self._others}
+        self._bounds = {c: None for c in self._buffers}
+
+    @property
+    def reference(self) -> int:
+        return self._reference
+
+    @property
+    def others(self) -> tuple:
+        return self._others
+
+    @property
+    def reach(self) -> int:
+        return self._reach
+
+    def feed(self, tags: dict, bounds: dict = None) -> None:
+        """Append the next sorted chunk of each channel; `bounds` states below which time a channel is complete."""
+        for c in self._buffers:
+            ts = tags.get(c)
+            if ts is not None and len(ts):
+                self._buffers[c] = np.concatenate((self._buffers[c], ts))
+            if bounds is not None and c in bounds:
+                self._bounds[c] = bounds[c]
+            elif len(self._buffers[c]):
+                # later tags may still tie with the last one seen
+                self._bounds[c] = self._buffers[c][-1]
+        if any(self._bounds[c] is None for c in self._others):
+            return
+        watermark = min(self._bounds[c] for c in self._others) - self._reach
+        refs = self._buffers[self._reference]
+        ready = np.searchsorted(refs, watermark, side="left")
+        if ready:
+            self.process(refs[:ready], self._buffers)
+            self._buffers[self._reference] = refs[ready:]
+        self._trim()
+
+    def _trim(self) -> None:
+        refs = self._buffers[self._reference]
+        if len(refs):
+            lower = refs[0]
+        elif self._bounds[self._reference] is not None:
+            lower = self._bounds[self._reference]
+        else:
+            return
+        for c in self._others:
+            buf = self._buffers[c]
+            self._buffers[c] = buf[np.searchsorted(buf, lower - self._reach, side="left"):]
+
+    def finish(self):
+        """Process the reference events still buffered; every stream is complete at this point."""
+        refs = self._buffers[self._reference]
+        if len(refs):
+            self.process(refs, self._buffers)
+        for c in self._buffers:
+            self._buffers[c] = self._buffers[c][:0]
+        return self.result()
+
+    @abstractmethod
+    def process(self, refs: np.ndarray, buffers: dict) -> None:
+        """Account for the released reference events `refs` against the buffered streams."""
+
+    @abstractmethod
+    def merge(self, other: "StreamEngine") -> None:
+        """Add the counts of an engine that processed a disjoint set of reference events."""
+
+    @abstractmethod
+    def result(self):
+        """Return the accumulated counts."""
+
+
+class TripleCoincidence(StreamEngine):
+    """Heralded coincidences between chh and ch1, ch2 within ±window_ticks (edges included).
+
+    The first `keep` triples (all of them with keep=None) are recorded as (herald, ch1 hits, ch2 hits).
+    """
+
+    def __init__(self, window_ticks: int, ch1: int = 1, ch2: int = 2, chh: int = 3, keep: int = 0) -> None:
+        super().__init__(chh, (ch1, ch2), window_ticks)
+        self._window = window_ticks
+        self._ch1, self._ch2 = ch1, ch2
+        self._keep = keep
+        self.n3 = self.n13 = self.n23 = self.n123 = 0
+        self.triples = []
+
+    def process(self, refs: np.ndarray, buffers: dict) -> None:
+        b1, b2 = buffers[self._ch1], buffers[self._ch2]
+        lo1 = np.searchsorted(b1, refs - self._window, side="left")
+        hi1 = np.searchsorted(b1, refs + self._window, side="right")
+        lo2 = np.searchsorted(b2, refs - self._window, side="left")
+        hi2 = np.searchsorted(b2, refs + self._window, side="right")
+        has1, has2 = hi1 > lo1, hi2 > lo2
+        both = has1 & has2
+        self.n3 += len(refs)
+        self.n13 += int(np.count_nonzero(has1))
+        self.n23 += int(np.count_nonzero(has2))
+        self.n123 += int(np.count_nonzero(both))
+        room = len(refs) if self._keep is None else max(self._keep - len(self.triples), 0)
+        for i in np.flatnonzero(both)[:room]:
+            self.triples.append((int(refs[i]), b1[lo1[i]:hi1[i]].tolist(), b2[lo2[i]:hi2[i]].tolist()))
+
+    def merge(self, other: "TripleCoincidence") -> None:
+        self.n3 += other.n3
+        self.n13 += other.n13
+        self.n23 += other.n23
+        self.n123 += other.n123
+        room = len(other.triples) if self._keep is None else max(self._keep - len(self.triples), 0)
+        self.triples.extend(other.triples[:room])
+
+    def result(self) -> dict:
+        return {"n3": self.n3, "n13": self.n13, "n23": self.n23, "n123": self.n123, "triples": self.triples}
+
+
+def nearest_distance(refs: np.ndarray, tags: np.ndarray) -> np.ndarray:
+    """Distance from each reference to the closest tag (int64 max when there is none)."""
+    far = np.iinfo(np.int64).max
+    if len(tags) == 0:
+        return np.full(len(refs), far, dtype=np.int64)
+    idx = np.searchsorted(tags, refs)
+    after = np.where(idx < len(tags), tags[np.minimum(idx, len(tags) - 1)] - refs, far)
+    before = np.where(idx > 0, refs - tags[np.maximum(idx - 1, 0)], far)
+    return np.minimum(after, before)
+
+
+class WindowScan(StreamEngine):
+    """Herald counts for every coincidence window up to max_ticks at once.
+
+    A herald coincides with ch1 within ±w exactly when its nearest ch1 tag is at most w away, so histograms
+    of the (capped) nearest-neighbour distances answer any window grid through cumulative sums.
+    """
+
+    def __init__(self, max_ticks: int, ch1: int = 1, ch2: int = 2, chh: int = 3) -> None:
+        super().__init__(chh, (ch1, ch2), max_ticks)
+        self._cap = max_ticks + 1
+        self._ch1, self._ch2 = ch1, ch2
+        self.n3 = 0
+        self.h13 = np.zeros(self._cap + 1, dtype=np.int64)
+        self.h23 = np.zeros(self._cap + 1, dtype=np.int64)
+        self.h123 = np.zeros(self._cap + 1, dtype=np.int64)
+
+    def process(self, refs: np.ndarray, buffers: dict) -> None:
+        d1 = np.minimum(nearest_distance(refs, buffers[self._ch1]), self._cap)
+        d2 = np.minimum(nearest_distance(refs, buffers[self._ch2]), self._cap)
+        self.n3 += len(refs)
+        self.h13 += np.bincount(d1, minlength=self._cap + 1)
+        self.h23 += np.bincount(d2, minlength=self._cap + 1)
+        self.h123 += np.bincount(np.maximum(d1, d2), minlength=self._cap + 1)
+
+    def merge(self, other: "WindowScan") -> None:
+        self.n3 += other.n3
+        self.h13 += other.h13
+        self.h23 += other.h23
+        self.h123 += other.h123
+
+    def result(self, windows_ticks=None) -> dict:
+        """Counts per window (all windows 0..max_ticks by default), as arrays."""
+        w = np.arange(self._cap) if windows_ticks is None else np.asarray(windows_ticks, dtype=np.int64)
+        if np.any((w < 0) | (w >= self._cap)):
+            raise ValueError(f"windows must lie in [0, {self._cap - 1}] ticks")
+        return {
+            "window_ticks": w,
+            "n3": np.full(len(w), self.n3, dtype=np.int64),
+            "n13": np.cumsum(self.h13)[w],
+            "n23": np.cumsum(self.h23)[w],
+            "n123": np.cumsum(self.h123)[w],
+        }
+
+
+def stream_triples(source, window_ticks, delays: dict = None, ch1=1, ch2=2, chh=3, keep=0, width=WIDTH) -> dict:
+    """Triple coincidences of every file in source, streamed through the archive in bounded memory."""
+    engine = TripleCoincidence(window_ticks, ch1, ch2, chh, keep)
+    for tags, bounds in iter_windows(source, (ch1, ch2, chh), delays, width):
+        engine.feed(tags, bounds)
+    return engine.finish()
+
+
+def scan_windows(source, windows_ticks, delays: dict = None, ch1=1, ch2=2, chh=3, width=WIDTH) -> dict:
+    """n3, n13, n23, n123 for every window in windows_ticks from a single streamed pass."""
+    windows_ticks = np.asarray(windows_ticks, dtype=np.int64)
+    engine = WindowScan(int(windows_ticks.max()), ch1, ch2, chh)
+    for tags, bounds in iter_windows(source, (ch1, ch2, chh), delays, width):
+        engine.feed(tags, bounds)
+    engine.finish()
+    return engine.result(windows_ticks)
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from photontags.tagarchive import TagArchive, open_archive
+from photontags.timetags import files
+
+SLICES_PER_WORKER = 4
+
+# archives already memory-mapped by this (worker) process
+_archives = {}
+
+
+def _archive(path: str) -> TagArchive:
+    if path not in _archives:
+        _archives[path] = TagArchive(path)
+    return _archives[path]
+
+
+def gather(paths: list, ch: int, start: int, stop: int) -> np.ndarray:
+    """Raw timestamps of one channel in [start, stop), merged over every archive."""
+    ts = np.concatenate([_archive(p).window(ch, start, stop) for p in paths])
+    if len(paths) > 1:
+        ts.sort(kind="stable")
+    return ts
+
+
+def run_slice(job: tuple) -> dict:
+    """Run fresh engines on the reference events of one time slice [t0, t1) (delayed time).
+
+    The other channels are read with a margin of each engine's reach on both sides, so every reference
+    event sees the same neighbours it would see in a single pass over the whole acquisition.
+    """
+    paths, t0, t1, delays, factory = job
+    engines = factory()
+    for engine in engines.values():
+        d = delays.get(engine.reference, 0)
+        tags = {engine.reference: gather(paths, engine.reference, t0 - d, t1 - d) + d}
+        for c in engine.others:
+            d = delays.get(c, 0)
+            tags[c] = gather(paths, c, t0 - engine.reach - d, t1 + engine.reach + 1 - d) + d
+        engine.feed(tags)
+        engine.finish()
+    return engines
+
+
+def analyse(source, factory, delays: dict = None, workers: int = None, slices: int = None, fmt: str = "timetags") -> dict:
+    """Run the engines built by `factory` over every file in source on a process pool.
+
+    factory must be a picklable callable returning {name: StreamEngine}; it is called once per slice.
+    Workers memory-map the archives by path, so no tag arrays are pickled. Partial engines are merged
+    in time order and returned as {name: engine}; read them with engine.result().
+    """
+    delays = delays or {}
+    workers = workers or os.cpu_count()
+    slices = slices or workers * SLICES_PER_WORKER
+    archives = [open_archive(p, fmt) for p in files(source)]
+    paths = [a.get_path() for a in archives]
+    spans = [np.add(a.span(c), delays.get(c, 0)) for a in archives for c in a.channels()]
+    if not spans:
+        return factory()
+    start, end = min(s for s, _ in spans), max(e for _, e in spans)
+    edges = np.unique(np.linspace(start, end + 1, slices + 1).astype(np.int64))
+    jobs = [(paths, int(t0), int(t1), delays, factory) for t0, t1 in zip(edges[:-1], edges[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(run_slice, jobs))
+    merged = parts[0]
+    for part in parts[1:]:
+        for name, engine in merged.items():
+            engine.merge(part[name])
+    return merged
@@ -1,8 +1,11 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import poisson
 
+from photontags.binning import integer_bin_counts
+from photontags.pyramid import count_pyramid
+from photontags.tagarchive import load
+
 # --- PARAMETERS ---
 FILE = r"C:\Users\Ismaele\Desktop\Elaborato2\data\TimeTags_3.txt"
 DIR="data"
@@ -11,40 +14,19 @@ BIN = 1e-3         # bin width in seconds (10 µs)
 CLOCK = 81e-12       # 81 ps clock period
 CHANNELS = [1, 2, 3] # channels to analyze
 BIN_CLOCK = int(BIN / CLOCK)
+SCAN_FACTORS = range(1, 31)  # Fano factor scan over windows of 1..30 BIN
 
 
 # --- LOAD EVENTS ---
-def load_events() -> list[tuple[int, int]]:
-    """Load all events (timestamp, channel)."""
-    if DIR_MODE:
-        lines = []
-        for entry in os.listdir(DIR):
-            with open(os.path.join(DIR, entry), mode="r", encoding="utf-8") as f:
-                lines += f.readlines()[6:]
-    else:
-        with open(FILE, mode="r", encoding="utf-8") as f:
-            lines = f.readlines()[6:]
-
-    events = []
-    for line in lines:
-        timestamp, ch = line.split(";")
-        events.append((int(timestamp.strip()), int(ch.strip())))
-    return events
+def load_events() -> dict[int, np.ndarray]:
+    """Load all events as {channel: sorted timestamps}."""
+    return load(DIR if DIR_MODE else FILE, channels=CHANNELS)
 
 
 # --- COUNT PHOTONS PER BIN ---
 def count_per_bin(events, ch):
     """Return array of photon counts per bin for one channel."""
-    ts = np.array([t for t, c in events if c == ch], dtype=np.int64)
-    ts.sort()
-    ts -= ts[0]
-    n_bins = int(ts[-1] // BIN_CLOCK) + 1
-    counts = np.zeros(n_bins, dtype=int)
-    for t in ts:
-        idx = int(t // BIN_CLOCK)
-        if idx < n_bins:
-            counts[idx] += 1
-    return counts
+    return integer_bin_counts(events[ch], BIN_CLOCK)
 
 
 # --- MAIN ---
@@ -86,6 +68,19 @@ def main():
     plt.legend()
     plt.grid(alpha=0.3)
     plt.tight_layout()
+
+    # Fano factor vs window, every width from the same binning
+    plt.figure(figsize=(8, 5))
+    for i, ch in enumerate(CHANNELS):
+        scan = count_pyramid(count_per_bin(events, ch), SCAN_FACTORS)
+        plt.plot(scan["factor"] * BIN * 1e3, scan["fano"], "o-", color=colors[i], label=f"Ch {ch}")
+    plt.axhline(1, color="k", ls="--", lw=1)
+    plt.xlabel("Window (ms)")
+    plt.ylabel("Fano factor")
+    plt.title("Fano Factor vs Window (All Channels)")
+    plt.legend()
+    plt.grid(alpha=0.3)
+    plt.tight_layout()
     plt.show()
 
 
@@ -3,6 +3,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import poisson
 
+from photontags.binning import integer_bin_counts
+from photontags.tagarchive import load
+
 # --- PARAMETERS ---
 FILE = r"C:\Users\Ismaele\Desktop\Elaborato2\data\TimeTags_5.txt"
 DIR_MODE = False
@@ -14,19 +17,7 @@ BIN_CLOCK = int(BIN / CLOCK)  # bin width in clock ticks
 
 # --- LOAD EVENTS ---
 def load_events() -> np.ndarray:
-    with open(FILE, mode="r", encoding="utf-8") as f:
-        lines = f.readlines()[6:]
-
-    timestamps = []
-    for line in lines:
-        timestamp, ch = line.split(";")
-        timestamp = int(timestamp.strip())
-        ch = int(ch.strip())
-        if ch == CH:
-            timestamps.append(timestamp)
-
-    arr = np.array(timestamps, dtype=np.int64)
-    arr.sort()
+    arr = load(FILE, channels=[CH])[CH]
     arr = arr - arr[0]  # shift to zero
     return arr
 
@@ -34,15 +25,8 @@ def load_events() -> np.ndarray:
 # --- MAIN ---
 def main() -> None:
     events = load_events()
-    total_time_ticks = events[-1]
-    n_bins = int(total_time_ticks // BIN_CLOCK) + 1
-
     # Count photons per bin
-    counts = np.zeros(n_bins, dtype=int)
-    for event in events:
-        idx = event // BIN_CLOCK
-        if idx < n_bins:
-            counts[int(idx)] += 1
+    counts = integer_bin_counts(events, BIN_CLOCK)
 
     # Histogram of counts per bin
     hist, edges = np.histogram(counts, bins=range(int(counts.max()) + 2))
@@ -0,0 +1,4 @@
+"""Time-tag loading, archiving and photon-count binning shared by the QuantumOpticsAndLasers scripts.
+
+Install once with `pip install -e QuantumOpticsAndLasers`.
+"""
@@ -0,0 +1,96 @@
+import numpy as np
+
+DEAD_TIME = 3900     # ticks; closer pulses are dead-time/afterpulse artefacts
+EDGES = 2**16        # minimum number of bin edges generated at once
+
+
+def dead_time_mask(ts: np.ndarray, dead_time: int = DEAD_TIME, last: int = None) -> np.ndarray:
+    """Keep a tag unless it follows the previous raw tag (`last` across chunks) by less than dead_time."""
+    gaps = np.diff(ts, prepend=ts[:1] if last is None else last)
+    mask = gaps >= dead_time
+    if last is None and len(mask):
+        mask[0] = True
+    return mask
+
+
+def integer_bin_counts(ts: np.ndarray, width: int) -> np.ndarray:
+    """Counts per bin of `width` ticks from the first tag on, empty bins included."""
+    if len(ts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.bincount((ts - ts[0]) // width)
+
+
+class Binner:
+    """Streaming, vectorized form of the counting loop in the PhotonDistribution scripts.
+
+    Bin edges are accumulated as `start += width` in float, exactly as the loop does, so a tag falls in the
+    bin whose upper edge is the first one at or above it. A tag sitting exactly on the upper edge of the
+    bin currently open starts the next bin instead, as in the loop; only those ties are replayed one by one.
+    """
+
+    def __init__(self, width: float, dead_time: int = DEAD_TIME) -> None:
+        self._width = float(width)
+        self._dead_time = dead_time
+        self._origin = None
+        self._last = None
+        self._current = 0                 # index of the bin still open
+        self._pending = 0                 # tags counted in it so far
+        self._base = 0                    # bin index of self._edges[0]
+        self._edges = np.zeros(1)         # accumulated edges s_base, s_base+1, ...
+
+    def _extend(self, upto: float) -> None:
+        if self._edges[-1] >= upto:
+            return
+        n = max(EDGES, int((upto - self._edges[-1]) / self._width) + 2)
+        step = np.full(n + 1, self._width)
+        step[0] = self._edges[-1]
+        self._edges = np.concatenate((self._edges, np.cumsum(step)[1:]))
+        self._extend(upto)
+
+    def feed(self, ts: np.ndarray) -> np.ndarray:
+        """Add a sorted chunk of one acquisition; return the counts of the bins it closed."""
+        ts = np.asarray(ts, dtype=np.int64)
+        if len(ts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        first = self._origin is None
+        if first:
+            self._origin = ts[0]
+        kept = ts[dead_time_mask(ts, self._dead_time, self._last)] - self._origin
+        self._last = ts[-1]
+        if len(kept) == 0:
+            return np.zeros(0, dtype=np.int64)
+        self._extend(float(kept[-1]))
+        r = np.searchsorted(self._edges, kept, side="left") - 1
+        upper = self._edges[np.minimum(r + 1, len(self._edges) - 1)]
+        bins = r + self._base
+        if first:
+            bins[0] = 0
+        ties = np.flatnonzero(kept == upper)
+        ties = ties[ties > 0] if first else ties
+        for i in ties:
+            previous = bins[i - 1] if i > 0 else self._current
+            if previous >= bins[i]:
+                bins[i] += 1
+        counts = np.bincount(bins - self._current, minlength=1)
+        counts[0] += self._pending
+        self._current = int(bins[-1])
+        self._pending = int(counts[-1])
+        # edges below the open bin are never needed again
+        drop = self._current - self._base
+        self._edges = self._edges[drop:]
+        self._base = self._current
+        return counts[:-1]
+
+    def finish(self) -> np.ndarray:
+        """Counts of the bin still open (nothing if no tag was fed)."""
+        if self._origin is None:
+            return np.zeros(0, dtype=np.int64)
+        counts = np.array([self._pending], dtype=np.int64)
+        self._pending = 0
+        return counts
+
+
+def bin_counts(ts: np.ndarray, width: float, dead_time: int = DEAD_TIME) -> np.ndarray:
+    """Counts per bin of one acquisition, dead-time filtered, with the loop's float-edge semantics."""
+    binner = Binner(width, dead_time)
+    return np.concatenate((binner.feed(ts), binner.finish()))
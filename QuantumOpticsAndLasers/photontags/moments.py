@@ -0,0 +1,138 @@
+import numpy as np
+
+ORDER = 3    # factorial moments kept by default, enough for g2 and g3
+
+
+class Moments:
+    """Running mean and variance, each chunk folded in with Chan's parallel update."""
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0         # sum of squared deviations from the mean
+
+    def _combine(self, n: int, mean: float, m2: float) -> None:
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def add(self, x: np.ndarray) -> None:
+        if len(x) == 0:
+            return
+        mean = float(np.mean(x))
+        self._combine(len(x), mean, float(np.sum(np.square(x - mean))))
+
+    def merge(self, other: "Moments") -> None:
+        self._combine(other.n, other.mean, other.m2)
+
+    def var(self, ddof: int = 0) -> float:
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+
+class FactorialMoments:
+    """Running means of the falling factorials n, n(n-1), ..., n(n-1)...(n-order+1)."""
+
+    def __init__(self, order: int = ORDER) -> None:
+        if order < 1:
+            raise ValueError("order must be at least 1")
+        self.n = 0
+        self.f = np.zeros(order)
+
+    def _combine(self, n: int, f: np.ndarray) -> None:
+        if n == 0:
+            return
+        self.n += n
+        self.f += (f - self.f) * n / self.n
+
+    def add(self, x: np.ndarray) -> None:
+        if len(x) == 0:
+            return
+        x = np.asarray(x, dtype=np.float64)
+        f = np.empty(len(self.f))
+        term = np.ones(len(x))
+        for k in range(len(self.f)):
+            term *= x - k
+            f[k] = term.mean()
+        self._combine(len(x), f)
+
+    def merge(self, other: "FactorialMoments") -> None:
+        self._combine(other.n, other.f)
+
+    def g(self, k: int) -> float:
+        """Normalised k-th order correlation <n(n-1)...(n-k+1)> / <n>^k; g(2) is g2(0)."""
+        if not 1 <= k <= len(self.f):
+            raise ValueError(f"order {k} not kept, expected 1..{len(self.f)}")
+        return self.f[k - 1] / self.f[0] ** k if self.f[0] else np.nan
+
+
+class Histogram:
+    """Running histogram of non-negative integer counts, grown as larger values appear."""
+
+    def __init__(self) -> None:
+        self.hist = np.zeros(0, dtype=np.int64)
+
+    def add_counts(self, hist: np.ndarray) -> None:
+        if len(hist) > len(self.hist):
+            self.hist = np.concatenate((self.hist, np.zeros(len(hist) - len(self.hist), dtype=np.int64)))
+        self.hist[:len(hist)] += hist
+
+    def add(self, x: np.ndarray) -> None:
+        if len(x):
+            self.add_counts(np.bincount(x))
+
+    def merge(self, other: "Histogram") -> None:
+        self.add_counts(other.hist)
+
+
+class CountAccumulator:
+    """Moments, factorial moments and histogram of bin counts, fed chunk by chunk and mergeable across workers."""
+
+    def __init__(self, order: int = ORDER) -> None:
+        self.moments = Moments()
+        self.factorial = FactorialMoments(order)
+        self.histogram = Histogram()
+
+    def add(self, counts: np.ndarray) -> None:
+        counts = np.asarray(counts, dtype=np.int64)
+        self.moments.add(counts)
+        self.factorial.add(counts)
+        self.histogram.add(counts)
+
+    def merge(self, other: "CountAccumulator") -> None:
+        self.moments.merge(other.moments)
+        self.factorial.merge(other.factorial)
+        self.histogram.merge(other.histogram)
+
+    @property
+    def n(self) -> int:
+        return self.moments.n
+
+    @property
+    def hist(self) -> np.ndarray:
+        return self.histogram.hist
+
+    def mean(self) -> float:
+        return self.moments.mean if self.n else np.nan
+
+    def var(self) -> float:
+        return self.moments.var()
+
+    def fano(self) -> float:
+        return self.var() / self.mean() if self.mean() else np.nan
+
+    def g2(self) -> float:
+        return self.factorial.g(2)
+
+    def result(self) -> dict:
+        return {
+            "n": self.n,
+            "mean": self.mean(),
+            "var": self.var(),
+            "fano": self.fano(),
+            "g2": self.g2(),
+            "hist": self.hist.copy(),
+        }
@@ -0,0 +1,65 @@
+import numpy as np
+
+from photontags.moments import CountAccumulator
+
+FACTORS = tuple(range(1, 31))    # default bin widths, in multiples of the finest bin
+
+
+class CountPyramid:
+    """Count statistics at many bin widths from one stream of finest-resolution bin counts.
+
+    A level `f` sums groups of f adjacent finest bins. It is built from the coarsest smaller level whose
+    factor divides f, so a 1, 2, 4, ... ladder costs little more than the finest level alone. Every level
+    holds back its incomplete group between feeds, and only a CountAccumulator is kept per level.
+    Coarse edges are the finest edges taken every f bins: with float-accumulated widths a level matches
+    direct binning at f * width up to the rounding of the edges.
+    """
+
+    def __init__(self, factors=FACTORS) -> None:
+        self._factors = sorted(set(int(f) for f in factors))
+        if not self._factors or self._factors[0] < 1:
+            raise ValueError("factors must be positive integers")
+        self._base = {}
+        for f in self._factors:
+            self._base[f] = max([b for b in self._base if f % b == 0], default=1)
+        self._rest = {f: np.zeros(0, dtype=np.int64) for f in self._factors}
+        self._stats = {f: CountAccumulator() for f in self._factors}
+
+    def feed(self, counts: np.ndarray) -> None:
+        """Add the next counts of the finest bins of the current acquisition."""
+        new = {1: np.asarray(counts, dtype=np.int64)}
+        for f in self._factors:
+            group = f // self._base[f]
+            series = np.concatenate((self._rest[f], new[self._base[f]]))
+            n = len(series) // group * group
+            new[f] = series[:n].reshape(-1, group).sum(axis=1)
+            self._rest[f] = series[n:]
+            self._stats[f].add(new[f])
+
+    def flush(self) -> None:
+        """End of an acquisition: drop every level's incomplete group so no bin straddles two files."""
+        self._rest = {f: r[:0] for f, r in self._rest.items()}
+
+    def merge(self, other: "CountPyramid") -> None:
+        for f in self._factors:
+            self._stats[f].merge(other._stats[f])
+
+    def result(self) -> dict:
+        """Per level, as arrays over factors: bins, mean, variance, Fano factor, g2; hist is a list of histograms."""
+        stats = [self._stats[f] for f in self._factors]
+        return {
+            "factor": np.array(self._factors),
+            "n": np.array([s.n for s in stats]),
+            "mean": np.array([s.mean() for s in stats]),
+            "var": np.array([s.var() for s in stats]),
+            "fano": np.array([s.fano() for s in stats]),
+            "g2": np.array([s.g2() for s in stats]),
+            "hist": [s.hist.copy() for s in stats],
+        }
+
+
+def count_pyramid(counts: np.ndarray, factors=FACTORS) -> dict:
+    """CountPyramid.result() for the finest-bin counts of one acquisition."""
+    pyramid = CountPyramid(factors)
+    pyramid.feed(counts)
+    return pyramid.result()
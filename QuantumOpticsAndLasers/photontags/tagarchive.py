@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from photontags.timetags import ARCHIVE, CHUNK, HEADER, files, iter_chunks
+
+MAGIC = b"TTARCH01"
+BLOCK = 2**16        # tags per index block
+CSV_CHANNEL = 1      # channel assigned to the single-detector comma-separated exports
+WIDTH = 2**32        # ticks per time slice streamed by iter_windows (~0.35 s at 82 ps)
+
+# layout of the supported text formats: (header lines, fixed channel)
+FORMATS = {
+    "timetags": (HEADER, None),
+    "csv": (1, CSV_CHANNEL),
+}
+
+
+def delta_dtype(max_delta: int) -> np.dtype:
+    """Narrowest unsigned dtype holding every delta of a channel."""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if max_delta <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError("delta does not fit in 64 bits")
+
+
+def steps(ts: np.ndarray, chunk: int = CHUNK):
+    """Yield the successive differences of a (memory-mapped) timestamp array block by block."""
+    for i in range(0, len(ts), chunk):
+        yield np.diff(ts[i:i + chunk + 1])
+
+
+def convert(path: str, dest: str = None, fmt: str = "timetags", chunk: int = CHUNK, block: int = BLOCK) -> str:
+    """Convert a text time-tag file into a binary archive and return the archive path."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {list(FORMATS)}")
+    skip, channel = FORMATS[fmt]
+    dest = dest or path + ARCHIVE
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(dest)), prefix=".tmp")
+    try:
+        # pass 1: spill raw timestamps per channel so the text is parsed only once
+        raw = {}
+        for ts, ch in iter_chunks(path, chunk, skip, channel):
+            for c in np.unique(ch):
+                c = int(c)
+                if c not in raw:
+                    raw[c] = open(os.path.join(tmp, f"{c}.raw"), "wb")
+                ts[ch == c].tofile(raw[c])
+        for f in raw.values():
+            f.close()
+
+        # pass 2: delta-encode each channel in its narrowest dtype, with a (first, offset) index per block
+        meta = {"version": 1, "block": block, "source": os.path.basename(path), "channels": {}}
+        with open(dest + ".part", "wb") as out:
+            out.write(MAGIC)
+            for c in sorted(raw):
+                ts = np.memmap(os.path.join(tmp, f"{c}.raw"), dtype=np.int64, mode="r")
+                if any(len(d) and d.min() < 0 for d in steps(ts, chunk)):
+                    ts = np.sort(ts, kind="stable")
+                dtype = delta_dtype(max((int(d.max()) for d in steps(ts, chunk) if len(d)), default=0))
+                out.write(b"\0" * (-out.tell() % 8))
+                offset = out.tell()
+                out.write(np.zeros(1, dtype=dtype).tobytes())
+                for d in steps(ts, chunk):
+                    out.write(d.astype(dtype).tobytes())
+                out.write(b"\0" * (-out.tell() % 8))
+                index = np.stack((ts[::block], offset + np.arange(0, len(ts), block) * dtype.itemsize), axis=1)
+                index_offset = out.tell()
+                out.write(index.astype(np.int64).tobytes())
+                meta["channels"][str(c)] = {
+                    "count": len(ts),
+                    "dtype": dtype.str,
+                    "offset": offset,
+                    "index": index_offset,
+                    "blocks": len(index),
+                    "last": int(ts[-1]),
+                }
+            footer = json.dumps(meta).encode("utf-8")
+            out.write(footer)
+            out.write(np.uint64(len(footer)).tobytes())
+            out.write(MAGIC)
+        os.replace(dest + ".part", dest)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return dest
+
+
+class TagArchive:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._mm[:8]) != MAGIC or bytes(self._mm[-8:]) != MAGIC:
+            raise ValueError(f"{path} is not a time-tag archive")
+        size = int(np.frombuffer(self._mm[-16:-8], dtype=np.uint64)[0])
+        meta = json.loads(bytes(self._mm[-16 - size:-16]).decode("utf-8"))
+        self._block = meta["block"]
+        self._source = meta["source"]
+        self._channels = {int(c): m for c, m in meta["channels"].items()}
+        self._deltas = {}
+        self._index = {}
+        for c, m in self._channels.items():
+            self._deltas[c] = np.ndarray((m["count"],), dtype=np.dtype(m["dtype"]), buffer=self._mm, offset=m["offset"])
+            self._index[c] = np.ndarray((m["blocks"], 2), dtype=np.int64, buffer=self._mm, offset=m["index"])
+
+    def get_path(self) -> str:
+        return self._path
+
+    def get_source(self) -> str:
+        return self._source
+
+    def channels(self) -> list[int]:
+        return sorted(self._channels)
+
+    def count(self, ch: int) -> int:
+        return self._channels[ch]["count"] if ch in self._channels else 0
+
+    def span(self, ch: int) -> tuple[int, int]:
+        """First and last timestamp of a channel."""
+        return int(self._index[ch][0, 0]), self._channels[ch]["last"]
+
+    def decode(self, ch: int, b0: int, b1: int) -> np.ndarray:
+        """Timestamps of blocks [b0, b1) of a channel."""
+        if ch not in self._channels or b0 >= b1:
+            return np.empty(0, dtype=np.int64)
+        ts = self._deltas[ch][b0 * self._block:b1 * self._block].astype(np.int64)
+        ts[0] = self._index[ch][b0, 0]
+        return np.cumsum(ts, out=ts)
+
+    def window(self, ch: int, start: int = None, stop: int = None) -> np.ndarray:
+        """Timestamps of a channel in [start, stop), decoding only the blocks that overlap it."""
+        if ch not in self._channels:
+            return np.empty(0, dtype=np.int64)
+        first = self._index[ch][:, 0]
+        # copies of `start` may end the block before the first block that starts at it
+        b0 = 0 if start is None else max(int(np.searchsorted(first, start, side="left")) - 1, 0)
+        b1 = len(first) if stop is None else int(np.searchsorted(first, stop, side="left"))
+        ts = self.decode(ch, b0, b1)
+        lo = 0 if start is None else np.searchsorted(ts, start, side="left")
+        hi = len(ts) if stop is None else np.searchsorted(ts, stop, side="left")
+        return ts[lo:hi]
+
+    def tags(self, ch: int) -> np.ndarray:
+        return self.window(ch)
+
+    def iter_blocks(self, ch: int, blocks: int = 64):
+        """Yield a channel's timestamps `blocks` index blocks at a time."""
+        n = len(self._index[ch]) if ch in self._channels else 0
+        for b in range(0, n, blocks):
+            yield self.decode(ch, b, min(b + blocks, n))
+
+
+def open_archive(path: str, fmt: str = "timetags") -> TagArchive:
+    """Open the archive of a text file, converting it first if it is missing or older than the text."""
+    if path.endswith(ARCHIVE):
+        return TagArchive(path)
+    dest = path + ARCHIVE
+    if not os.path.exists(dest) or os.path.getmtime(dest) < os.path.getmtime(path):
+        print(f"Converting {path} -> {dest}")
+        convert(path, dest, fmt)
+    return TagArchive(dest)
+
+
+def load(source, delays: dict = None, channels=None, fmt: str = "timetags") -> dict:
+    """Archive-backed equivalent of timetags.load: {channel: sorted int64 timestamps} with delays applied."""
+    delays = delays or {}
+    parts = {}
+    for path in files(source):
+        print(f"Examining file: {path}")
+        archive = open_archive(path, fmt)
+        for c in archive.channels():
+            if channels is None or c in channels:
+                parts.setdefault(c, []).append(archive.tags(c))
+    tags = {}
+    for c in sorted(parts):
+        ts = np.concatenate(parts[c])
+        if delays.get(c):
+            ts += delays[c]
+        if np.any(ts[1:] < ts[:-1]):
+            ts.sort(kind="stable")
+        tags[c] = ts
+    for c in channels or []:
+        tags.setdefault(c, np.empty(0, dtype=np.int64))
+    return tags
+
+
+def iter_windows(source, channels, delays: dict = None, width: int = WIDTH, fmt: str = "timetags"):
+    """Stream every file in source as successive raw-time slices [t, t + width).
+
+    Yields ({channel: sorted timestamps}, {channel: bound}) with delays applied; each channel is
+    complete below its bound. Files are merged slice by slice, exactly as load() merges them whole.
+    """
+    delays = delays or {}
+    archives = [open_archive(path, fmt) for path in files(source)]
+    spans = [a.span(c) for a in archives for c in channels if a.count(c)]
+    if not spans:
+        return
+    start, end = min(s for s, _ in spans), max(e for _, e in spans)
+    for t in range(start, end + 1, width):
+        tags, bounds = {}, {}
+        for c in channels:
+            ts = np.concatenate([a.window(c, t, t + width) for a in archives])
+            if len(archives) > 1:
+                ts.sort(kind="stable")
+            tags[c] = ts + delays.get(c, 0)
+            bounds[c] = t + width + delays.get(c, 0)
+        yield tags, bounds
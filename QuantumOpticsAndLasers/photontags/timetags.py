@@ -0,0 +1,85 @@
+import os
+import numpy as np
+
+HEADER = 6           # header lines at the top of every TimeTags*.txt
+CHUNK = 2**22        # bytes read per parsing step
+ARCHIVE = ".tta"     # suffix of the binary copies written by tagarchive
+BLANKS = bytes.maketrans(b";,\t\r", b"    ")   # field separators read as spaces
+
+
+def parse(buf: bytes, columns: int = 2) -> np.ndarray:
+    """Parse whole lines of integer fields into an (n, columns) int64 array of their first `columns` fields.
+
+    Fields are separated by whitespace, ';', ',' or tabs, and every line holds as many fields as the first.
+    """
+    text = buf.translate(BLANKS).lstrip()
+    if not text:
+        return np.empty((0, columns), dtype=np.int64)
+    end = text.find(b"\n")
+    fields = len((text if end < 0 else text[:end]).split())
+    if fields < columns:
+        raise ValueError(f"expected at least {columns} integers per line")
+    values = np.fromstring(text, dtype=np.int64, sep=" ")
+    if len(values) % fields:
+        raise ValueError(f"expected {fields} integers per line")
+    return values.reshape(-1, fields)[:, :columns]
+
+
+def files(source) -> list[str]:
+    """Expand a file, a directory or a list of either into a sorted list of files."""
+    if isinstance(source, (list, tuple)):
+        return [f for s in source for f in files(s)]
+    if os.path.isdir(source):
+        # archives, their unfinished .part copies and subdirectories are not tag files
+        paths = [os.path.join(source, e) for e in sorted(os.listdir(source)) if ARCHIVE not in e]
+        return [p for p in paths if os.path.isfile(p)]
+    return [source]
+
+
+def iter_chunks(path: str, chunk: int = CHUNK, skip: int = HEADER, channel: int = None):
+    """Yield (timestamps, channels) arrays for successive blocks of one file, in file order.
+
+    Files without a channel column (e.g. the comma-separated exports) are read with `channel` set.
+    """
+    columns = 2 if channel is None else 1
+    with open(path, mode="rb") as f:
+        for _ in range(skip):
+            f.readline()
+        rest = b""
+        while True:
+            buf = f.read(chunk)
+            last = not buf
+            buf = rest + buf
+            cut = len(buf) if last else buf.rfind(b"\n") + 1
+            buf, rest = buf[:cut], buf[cut:]
+            if buf.strip():
+                rows = parse(buf, columns)
+                if channel is None:
+                    yield rows[:, 0], rows[:, 1].astype(np.uint8)
+                else:
+                    yield rows[:, 0], np.full(len(rows), channel, dtype=np.uint8)
+            if last:
+                break
+
+
+def load(source, delays: dict = None, channels=None, chunk: int = CHUNK, skip: int = HEADER) -> dict:
+    """Load time tags into {channel: sorted int64 timestamps}, shifting each channel by delays[channel] ticks."""
+    delays = delays or {}
+    parts = {}
+    for path in files(source):
+        print(f"Examining file: {path}")
+        for ts, ch in iter_chunks(path, chunk, skip):
+            for c in np.unique(ch):
+                if channels is None or c in channels:
+                    parts.setdefault(int(c), []).append(ts[ch == c])
+    tags = {}
+    for c in sorted(parts):
+        ts = np.concatenate(parts[c])
+        if delays.get(c):
+            ts += delays[c]
+        if np.any(ts[1:] < ts[:-1]):
+            ts.sort(kind="stable")
+        tags[c] = ts
+    for c in channels or []:
+        tags.setdefault(c, np.empty(0, dtype=np.int64))
+    return tags
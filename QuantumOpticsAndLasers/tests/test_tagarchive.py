@@ -0,0 +1,25 @@
+import numpy as np
+
+from photontags.tagarchive import TagArchive, convert
+
+
+def make_archive(tmp_path, ts, ch=1, block=8):
+    text = tmp_path / "TimeTags.txt"
+    text.write_text("header\n" * 6 + "".join(f"{t};{ch}\n" for t in ts))
+    return TagArchive(convert(str(text), block=block))
+
+
+def test_window_keeps_duplicates_across_block_boundary(tmp_path):
+    # block 0 ends with two copies of 155, block 1 starts with two more
+    ts = [0, 10, 20, 30, 40, 50, 155, 155, 155, 155, 160, 170, 180, 190, 200, 210]
+    archive = make_archive(tmp_path, ts)
+    assert archive.window(1, 155, 200).tolist() == [155, 155, 155, 155, 160, 170, 180, 190]
+
+
+def test_window_matches_direct_slice(tmp_path):
+    rng = np.random.default_rng(0)
+    ts = np.sort(rng.integers(0, 200, 300))
+    archive = make_archive(tmp_path, ts)
+    for start, stop in rng.integers(-10, 210, (200, 2)):
+        expected = ts[(ts >= start) & (ts < stop)]
+        assert archive.window(1, int(start), int(stop)).tolist() == expected.tolist()
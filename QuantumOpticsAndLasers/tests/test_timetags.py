@@ -0,0 +1,8 @@
+from photontags.timetags import files
+
+
+def test_files_skips_archives_partial_archives_and_directories(tmp_path):
+    for name in ("a.txt", "a.txt.tta", "b.txt.tta.part", "c.csv"):
+        (tmp_path / name).write_text("")
+    (tmp_path / ".tmpdir").mkdir()
+    assert files(str(tmp_path)) == [str(tmp_path / "a.txt"), str(tmp_path / "c.csv")]
@@ -0,0 +1,25 @@
+from pkg.data import *
+from pkg.sweep import *
+
+import json,os,sys,time
+
+PARAM_FILE=os.path.join(os.getcwd(),"parameters.json")
+SWEEP_FILE=os.path.join(os.getcwd(),"sweep.json")
+
+def progress(done: int,total: int) -> None:
+    sys.stdout.write("\033[F")
+    sys.stdout.write("\033[K")
+    sys.stdout.write("Completed jobs: {d}/{t}\n".format(d=done,t=total))
+
+def main() -> None:
+    with open(SWEEP_FILE,mode="r") as f:
+        spec=json.load(f)
+    sweep=Sweep(PARAM_FILE,spec["grid"],os.path.join(os.getcwd(),spec["store"]),backend=spec.get("backend","numpy"))
+    total=len(sweep.jobs())
+    sys.stdout.write("Sweep of {t} jobs, {s} already in the store\n\n".format(t=total,s=total-len(sweep.pending())))
+    start=time.time()
+    n=sweep.run(callback=progress)
+    sys.stdout.write("Ran {n} jobs in {el} s\n".format(n=n,el=round(time.time()-start,2)))
+
+if __name__=="__main__":
+    main()
\ No newline at end of file
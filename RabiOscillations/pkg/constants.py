@@ -0,0 +1,7 @@
+from mpmath import mp
+
+PRECISION=25
+CHUNK=2**22
+BACKENDS=("numpy","mpmath","hybrid")
+
+mp.dps=PRECISION
@@ -1,20 +1,21 @@
-import json
+import json,math
 from typing import Any
 import numpy as np
 
 from mpmath import exp,cosh,sinh,mp,cos
 
-PRECISION=25
-
-mp.dps=PRECISION
-
+from pkg.constants import PRECISION,CHUNK,BACKENDS
 from pkg.distribution import PhotonDistribution
 
 class Simulation(object):
-    def __init__(self, p_file: str, squeeze: bool) -> None:
+    def __init__(self, p_file: str, squeeze: bool, backend: str="mpmath", cache: Any=None) -> None:
+        if backend not in BACKENDS: raise ValueError("Backend must be one of {b}".format(b=", ".join(BACKENDS)))
         self.__file=p_file
         self.__parameters={}
         self.__squeeze=squeeze
+        self.__backend=backend
+        self.__cache=cache
+        self.__arrays=None
         
     def get_param(self,param: str) -> Any:
         if param not in self.__parameters.keys():
@@ -26,14 +27,40 @@ class Simulation(object):
         obj=args[0]
         return [obj.__parameters[arg] for arg in args[1:] if arg in obj.__parameters]
         
-    def load(self) -> None:
+    def get_backend(self) -> str:
+        return self.__backend
+        
+    def load(self,overrides: dict=None) -> None:
         with open(self.__file,mode="r") as f:
             self.__parameters=json.load(f)
+        if overrides is not None: self.__parameters.update(overrides)
+        self.__arrays=None
         self.__fill_in()
         
     def __fill_in(self) -> None:
+        key=None if self.__cache is None else self.__cache.key(self.__parameters,self.__squeeze,self.__backend)
         self.__parameters["PHI"]*=np.pi
         self.__parameters["PHI_SQUEEZE"]*=np.pi
+        if self.__backend=="mpmath": self.__to_mp()
+        else: self.__to_np()
+        cached=None if key is None else self.__cache.get(key)
+        if cached is not None:
+            self.__parameters.update(cached)
+            self.__parameters["N_TH"]=len(self.__parameters["C20"])
+            if "TAIL_ERROR" in cached: self.__parameters["TAIL_ERROR"]=float(cached["TAIL_ERROR"][0])
+            return
+        tail=None
+        # an optional TAIL_TOL overrides N_TH with the smallest cutoff whose tail stays below it
+        if "TAIL_TOL" in self.__parameters:
+            self.__parameters["N_TH"],tail=PhotonDistribution.cutoff(self.__parameters,self.__squeeze,float(self.__parameters["TAIL_TOL"]))
+        if self.__squeeze:
+            PhotonDistribution.squeezed(self.__parameters,self.__backend)
+            PhotonDistribution.normalize(self.__parameters["C20"])
+        else: PhotonDistribution.coherent(self.__parameters,self.__backend)
+        if tail is not None and self.__backend!="mpmath": self.__parameters["TAIL_ERROR"]=tail
+        if key is not None: self.__cache.put(key,{"C20":self.__parameters["C20"],"RABI":self.__parameters["RABI"],"TAIL_ERROR":np.array([self.__parameters["TAIL_ERROR"]])})
+        
+    def __to_mp(self) -> None:
         for key in self.__parameters.keys():
             if isinstance(self.__parameters[key],complex):
                 self.__parameters[key]=mp.mpc(np.real(self.__parameters[key]),np.imag(self.__parameters[key]))
@@ -45,14 +72,57 @@ class Simulation(object):
         self.__parameters["DELTA_2"]=self.__parameters["DETUNING"]**2
         self.__parameters["MU"]=cosh(self.__parameters["R"])
         self.__parameters["V"]=sinh(self.__parameters["R"])*exp(mp.mpc(0,self.__parameters["PHI_SQUEEZE"]))
-        if self.__squeeze: 
-            PhotonDistribution.squeezed(self.__parameters)
-            PhotonDistribution.normalize(self.__parameters["C20"])
-        else: PhotonDistribution.coherent(self.__parameters)
         
+    def __to_np(self) -> None:
+        self.__parameters["ALPHA"]=self.__parameters["A"]*np.exp(1j*self.__parameters["PHI"])
+        self.__parameters["XI"]=self.__parameters["R"]*np.exp(1j*self.__parameters["PHI_SQUEEZE"])
+        self.__parameters["N_BAR"]=self.__parameters["A"]**2
+        self.__parameters["DELTA_2"]=self.__parameters["DETUNING"]**2
+        self.__parameters["MU"]=np.cosh(self.__parameters["R"])
+        self.__parameters["V"]=np.sinh(self.__parameters["R"])*np.exp(1j*self.__parameters["PHI_SQUEEZE"])
         
     def evolve(self,t: float) -> tuple[float,float]:
+        if self.__backend!="mpmath":
+            c20,rabi=self.get_arrays()
+            c2t=float(c20@(np.cos(rabi*t*0.5)**2))
+            return 1-c2t,c2t
         c2t=0
         for n in range(self.__parameters["N_TH"]):
             c2t+=self.__parameters["C20"][n]*cos(self.__parameters["RABI"][n]*t*0.5)**2
-        return 1-c2t,c2t
\ No newline at end of file
+        return 1-c2t,c2t
+        
+    def get_arrays(self) -> tuple[np.ndarray,np.ndarray]:
+        if self.__arrays is None:
+            N_TH=self.__parameters["N_TH"]
+            c20=np.array(self.__parameters["C20"][:N_TH],dtype=np.float64)
+            rabi=np.array(self.__parameters["RABI"][:N_TH],dtype=np.float64)
+            self.__arrays=(c20,rabi)
+        return self.__arrays
+        
+    def evolve_many(self,tspace: np.ndarray,chunk: int=CHUNK) -> tuple[np.ndarray,np.ndarray]:
+        c20,rabi=self.get_arrays()
+        tspace=np.asarray(tspace,dtype=np.float64)
+        c2t=np.empty(len(tspace),dtype=np.float64)
+        step=max(1,chunk//max(1,len(rabi)))
+        for i in range(0,len(tspace),step):
+            c2t[i:i+step]=c20@(np.cos(np.multiply.outer(0.5*rabi,tspace[i:i+step]))**2)
+        return 1-c2t,c2t
+        
+    @staticmethod
+    def deviation(p_file: str,squeeze: bool,reference: str="mpmath") -> dict:
+        sims={}
+        for backend in BACKENDS:
+            sims[backend]=Simulation(p_file,squeeze,backend)
+            sims[backend].load()
+        T_STOP,T_STEP,T_START=sims[reference].get_params("TIME_STOP","TIME_STEP","TIME_START")
+        tspace=np.linspace(float(T_START),float(T_STOP),math.ceil(T_STOP/T_STEP))
+        c20_ref,_=sims[reference].get_arrays()
+        c1t,c2t=sims[reference].evolve_many(tspace)
+        w_ref=c2t-c1t
+        report={}
+        for backend,sim in sims.items():
+            if backend==reference: continue
+            c20,_=sim.get_arrays()
+            c1t,c2t=sim.evolve_many(tspace)
+            report[backend]={"C20":float(np.max(np.abs(c20-c20_ref))),"W":float(np.max(np.abs(c2t-c1t-w_ref)))}
+        return report
@@ -0,0 +1,69 @@
+import hashlib,json,os,shutil,tempfile
+import numpy as np
+from mpmath import mp
+
+from pkg.constants import PRECISION
+
+MAX_BYTES=2**30
+KEYS=("N_TH","A","PHI","R","PHI_SQUEEZE","DETUNING","G","TAIL_TOL")
+
+class DistributionCache(object):
+    def __init__(self,directory: str,max_bytes: int=MAX_BYTES) -> None:
+        os.makedirs(directory,exist_ok=True)
+        self.__directory=directory
+        self.__max_bytes=max_bytes
+        self.hits=0
+        self.misses=0
+
+    def key(self,params: dict,squeeze: bool,backend: str) -> str:
+        payload={k:params.get(k) for k in KEYS}
+        payload["squeeze"]=squeeze
+        payload["backend"]=backend
+        payload["precision"]=PRECISION if backend=="mpmath" else 53
+        return hashlib.sha1(json.dumps(payload,sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self,key: str) -> dict:
+        path=os.path.join(self.__directory,key)
+        if not os.path.isdir(path):
+            self.misses+=1
+            return None
+        arrays={}
+        for entry in os.listdir(path):
+            array=np.load(os.path.join(path,entry),mmap_mode="r")
+            arrays[entry[:-4]]=[mp.mpf(str(x)) for x in array] if array.dtype.kind=="U" else array
+        os.utime(path)
+        self.hits+=1
+        return arrays
+
+    def put(self,key: str,arrays: dict) -> None:
+        path=os.path.join(self.__directory,key)
+        tmp=tempfile.mkdtemp(dir=self.__directory,prefix=".tmp")
+        for name,array in arrays.items():
+            if isinstance(array,list): array=np.array([mp.nstr(x,PRECISION+5) for x in array])
+            np.save(os.path.join(tmp,name+".npy"),np.asarray(array))
+        if os.path.isdir(path): shutil.rmtree(path)
+        os.replace(tmp,path)
+        self.evict()
+
+    def entries(self) -> list:
+        entries=[]
+        for key in os.listdir(self.__directory):
+            path=os.path.join(self.__directory,key)
+            if key.startswith(".") or not os.path.isdir(path): continue
+            size=sum(os.path.getsize(os.path.join(path,f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path),size,key))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _,size,_ in self.entries())
+
+    def evict(self) -> None:
+        entries=self.entries()
+        total=sum(size for _,size,_ in entries)
+        for _,size,key in entries:
+            if total<=self.__max_bytes: break
+            shutil.rmtree(os.path.join(self.__directory,key))
+            total-=size
+
+    def clear(self) -> None:
+        for _,_,key in self.entries(): shutil.rmtree(os.path.join(self.__directory,key))
@@ -1,15 +1,24 @@
 import numpy as np
 from mpmath import mp,sqrt,exp,ln,factorial
+from scipy.special import gammaln,xlogy
 
 from pkg.cached import *
-from pkg.data import PRECISION
+from pkg.hermite import log_hermite,log_hermite_mp,complex_log_hermite
+from pkg.constants import PRECISION
 
 mp.dps=PRECISION
+MAX_CUTOFF_STEPS=1000
 
 class PhotonDistribution(object):
     @staticmethod
-    def coherent(params: dict) -> None:
+    def coherent(params: dict,backend: str="mpmath") -> None:
         N_TH,DELTA_2,N_BAR,G=params["N_TH"],params["DELTA_2"],params["N_BAR"],params["G"]
+        if backend!="mpmath":
+            n=np.arange(N_TH)
+            params["RABI"]=np.sqrt(DELTA_2+4*(G**2)*n)
+            params["C20"]=np.exp(-N_BAR+xlogy(n,N_BAR)-gammaln(n+1))
+            params["TAIL_ERROR"]=max(0.0,1-float(np.sum(params["C20"])))
+            return
         RABI=[0 for _ in range(N_TH)]
         C20=[0 for _ in range(N_TH)]
         for n in range(0,N_TH):
@@ -17,23 +26,90 @@ class PhotonDistribution(object):
             C20[n]=exp(-N_BAR)*((N_BAR**(n))/factorial(n,exact=True))
         params["RABI"]=RABI
         params["C20"]=C20
+        params["TAIL_ERROR"]=max(0.0,float(1-sum(C20)))
         
     @staticmethod
-    def squeezed(params: dict) -> None:
+    def squeezed(params: dict,backend: str="mpmath") -> None:
         N_TH,MU,ALPHA,V,DELTA_2,G=params["N_TH"],params["MU"],params["ALPHA"],params["V"],params["DELTA_2"],params["G"]
+        if backend!="mpmath":
+            n=np.arange(N_TH)
+            z=ALPHA/np.sqrt(2*MU*V)
+            if backend=="hybrid": lh=np.array([float(l) for l in log_hermite_mp(N_TH,mp.mpc(z.real,z.imag))])
+            else: lh=log_hermite(N_TH,z)
+            lg=-np.log(MU)-gammaln(n+1)+n*np.log(abs(V/(2*MU)))+2*lh
+            params["C20"]=np.exp(lg)
+            params["RABI"]=np.sqrt(DELTA_2+4*(G**2)*(n+1))
+            params["TAIL_ERROR"]=max(0.0,1-float(np.sum(params["C20"])*np.exp(PhotonDistribution.log_norm(ALPHA,MU,V))))
+            return
         RABI=[0 for _ in range(N_TH)]
         C20=[0 for _ in range(N_TH)]
+        LH=log_hermite_mp(N_TH,ALPHA/sqrt(2*MU*V))
         for n in range(N_TH):
-            lg=-ln(MU)-ln(cached_factorial(n))+n*ln(abs(V/(2*MU)))+2*ln(abs(cached_hermite(n,ALPHA/sqrt(2*MU*V))))
+            lg=-ln(MU)-ln(cached_factorial(n))+n*ln(abs(V/(2*MU)))+2*LH[n]
             C20[n]=exp(lg)
             RABI[n]=sqrt(DELTA_2+4*(G**2)*(n+1))
         params["RABI"]=RABI
         params["C20"]=C20
-    
+        params["TAIL_ERROR"]=max(0.0,float(1-sum(C20)*exp(-abs(ALPHA)**2+(V.conjugate()*ALPHA**2/MU).real)))
+        
+    @staticmethod
+    def log_norm(ALPHA: complex,MU: float,V: complex) -> float:
+        return -abs(ALPHA)**2+np.real(np.conj(V)*ALPHA**2/MU)
+        
+    @staticmethod
+    def moments(params: dict,squeeze: bool) -> tuple[float,float]:
+        if not squeeze: return float(params["N_BAR"]),float(params["N_BAR"])
+        ALPHA,MU,V=complex(params["ALPHA"]),float(params["MU"]),complex(params["V"])
+        gamma=MU*ALPHA-V*np.conj(ALPHA)
+        mean=abs(gamma)**2+abs(V)**2
+        var=abs(gamma)**2*(MU**2+abs(V)**2)-2*MU*np.real(np.conj(gamma)**2*V)+2*MU**2*abs(V)**2
+        return mean,var
+        
+    @staticmethod
+    def cutoff(params: dict,squeeze: bool,tol: float) -> tuple[int,float]:
+        mean,var=PhotonDistribution.moments(params,squeeze)
+        sigma=max(1.0,np.sqrt(var))
+        N=int(np.ceil(mean+6*sigma))+2
+        for _ in range(MAX_CUTOFF_STEPS):
+            n=np.arange(N)
+            if squeeze:
+                ALPHA,MU,V=complex(params["ALPHA"]),float(params["MU"]),complex(params["V"])
+                lg=-np.log(MU)-gammaln(n+1)+n*np.log(abs(V/(2*MU)))+2*log_hermite(N,ALPHA/np.sqrt(2*MU*V))+PhotonDistribution.log_norm(ALPHA,MU,V)
+            else:
+                lg=-mean+xlogy(n,mean)-gammaln(n+1)
+            P=np.exp(lg)
+            m=max(2,int(np.ceil(sigma/2)))
+            r=np.sum(P[-m:])/max(np.sum(P[-2*m:-m]),np.finfo(np.float64).tiny)
+            if not (np.all(np.isfinite(P)) and np.isfinite(r)): raise ValueError("Non-finite photon distribution, cannot choose a cutoff for these parameters")
+            if N>mean+sigma and r<1:
+                beyond=np.sum(P[-m:])*r/(1-r)
+                if beyond<=1e-3*tol: break
+            N=int(np.ceil(N+2*sigma))+2
+        else: raise ValueError("No cutoff within {s} steps reaches a tail below {t}".format(s=MAX_CUTOFF_STEPS,t=tol))
+        tail=np.cumsum(P[::-1])[::-1]+beyond
+        k=int(np.argmax(tail<=tol)) if np.any(tail<=tol) else N
+        return max(k,1),float(tail[k]) if k<N else float(beyond)
+        
+    @staticmethod
+    def amplitudes(N_TH: int,ALPHA: complex,XI: complex) -> np.ndarray:
+        ALPHA,XI=complex(ALPHA),complex(XI)
+        n=np.arange(N_TH)
+        if XI==0:
+            with np.errstate(divide="ignore"):
+                return np.exp(-abs(ALPHA)**2/2+xlogy(n,ALPHA+0j)-gammaln(n+1)/2)
+        MU=np.cosh(abs(XI))
+        V=np.sinh(abs(XI))*np.exp(1j*np.angle(XI))
+        BETA=MU*ALPHA+V*np.conj(ALPHA)
+        lg=-np.log(MU)/2-gammaln(n+1)/2+n*np.log(V/(2*MU))/2+complex_log_hermite(N_TH,BETA/np.sqrt(2*MU*V))
+        return np.exp(lg-abs(BETA)**2/2+np.conj(V)*BETA**2/(2*MU))
+        
     @staticmethod
     def normalize(distribution: list) -> None:
+        if isinstance(distribution,np.ndarray):
+            distribution/=np.sum(distribution)
+            return
         c=sum(distribution)
         for i in range(len(distribution)): distribution[i]/=c
         
         
-    
\ No newline at end of file
+        
\ No newline at end of file
@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+from scipy.signal import hilbert
+
+def turning_points(signal: np.ndarray,state: int=-1) -> tuple[np.ndarray,np.ndarray,int]:
+    d=np.diff(signal)
+    nz=np.flatnonzero(d)
+    if len(nz)==0: return np.empty(0,dtype=np.int64),np.empty(0,dtype=np.int64),state
+    signs=np.sign(d[nz]).astype(np.int64)
+    prev=np.concatenate(([state],signs[:-1]))
+    turns=nz[signs!=prev]
+    up=signs[signs!=prev]>0
+    return turns[~up],turns[up],int(signs[-1])
+
+def extrema(signal: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+    maxima,minima,_=turning_points(np.asarray(signal,dtype=np.float64))
+    return maxima,minima
+
+def hold(n: int,positions: np.ndarray,values: np.ndarray,carry: float) -> np.ndarray:
+    idx=np.full(n,-1,dtype=np.int64)
+    idx[positions]=np.arange(len(positions))
+    idx=np.maximum.accumulate(idx)
+    out=np.where(idx>=0,values[np.maximum(idx,0)] if len(values) else carry,carry)
+    return out.astype(np.float64)
+
+def step_envelope(signal: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+    signal=np.asarray(signal,dtype=np.float64)
+    maxima,minima=extrema(signal)
+    top_first=signal[maxima[0]] if len(maxima) else signal[0]
+    bottom_first=signal[minima[0]] if len(minima) else signal[0]
+    top=hold(len(signal),maxima+1,signal[maxima],top_first)
+    bottom=hold(len(signal),minima+1,signal[minima],bottom_first)
+    return top,bottom
+
+def interpolated_envelope(signal: np.ndarray,t: np.ndarray=None,kind: str="spline") -> tuple[np.ndarray,np.ndarray]:
+    signal=np.asarray(signal,dtype=np.float64)
+    t=np.arange(len(signal),dtype=np.float64) if t is None else np.asarray(t,dtype=np.float64)
+    maxima,minima=extrema(signal)
+    envelopes=[]
+    for idx in (maxima,minima):
+        if len(idx)<2: envelopes.append(np.full(len(signal),signal[idx[0]] if len(idx) else signal[0]))
+        elif kind=="spline" and len(idx)>=4: envelopes.append(CubicSpline(t[idx],signal[idx])(np.clip(t,t[idx[0]],t[idx[-1]])))
+        else: envelopes.append(np.interp(t,t[idx],signal[idx]))
+    return envelopes[0],envelopes[1]
+
+def hilbert_envelope(signal: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+    signal=np.asarray(signal,dtype=np.float64)
+    mean=np.mean(signal)
+    amplitude=np.abs(hilbert(signal-mean))
+    return mean+amplitude,mean-amplitude
+
+class EnvelopeStream(object):
+    def __init__(self) -> None:
+        self.__last=None
+        self.__state=-1
+        self.__top=None
+        self.__bottom=None
+        self.__pending=[]
+
+    def feed(self,chunk: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+        chunk=np.asarray(chunk,dtype=np.float64)
+        if len(chunk)==0: return np.empty(0),np.empty(0)
+        signal=chunk if self.__last is None else np.concatenate(([self.__last],chunk))
+        maxima,minima,self.__state=turning_points(signal,self.__state)
+        offset=len(signal)-len(chunk)
+        if self.__top is None and len(maxima): self.__top=signal[maxima[0]]
+        if self.__bottom is None and len(minima): self.__bottom=signal[minima[0]]
+        self.__last=chunk[-1]
+        if self.__top is None or self.__bottom is None:
+            self.__pending.append(chunk)
+            return np.empty(0),np.empty(0)
+        top=hold(len(signal),maxima+1,signal[maxima],self.__top)[offset:]
+        bottom=hold(len(signal),minima+1,signal[minima],self.__bottom)[offset:]
+        self.__top,self.__bottom=top[-1],bottom[-1]
+        if self.__pending:
+            pending=self.__pending
+            self.__pending=[]
+            self.__last,self.__state,self.__top,self.__bottom=None,-1,None,None
+            return self.feed(np.concatenate(pending+[chunk]))
+        return top,bottom
+
+    def finish(self) -> tuple[np.ndarray,np.ndarray]:
+        if not self.__pending: return np.empty(0),np.empty(0)
+        top,bottom=step_envelope(np.concatenate(self.__pending))
+        self.__pending=[]
+        return top,bottom
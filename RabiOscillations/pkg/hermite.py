@@ -0,0 +1,38 @@
+import numpy as np
+from mpmath import mp,ln,fabs
+
+def scaled_hermite(N_TH: int,z: np.ndarray):
+    z=np.asarray(z,dtype=np.complex128)
+    h0=np.ones(z.shape,dtype=np.complex128)
+    h1=2*z
+    scale=np.zeros(z.shape,dtype=np.float64)
+    for n in range(N_TH):
+        yield h0,scale
+        h0,h1=h1,2*z*h1-2*(n+1)*h0
+        m=np.maximum(np.abs(h0),np.abs(h1))
+        m=np.where(m==0,1,m)
+        h0/=m
+        h1/=m
+        scale+=np.log(m)
+
+def log_hermite(N_TH: int,z: np.ndarray) -> np.ndarray:
+    lh=np.empty((N_TH,)+np.shape(z),dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        for n,(h,scale) in enumerate(scaled_hermite(N_TH,z)):
+            lh[n]=scale+np.log(np.abs(h))
+    return lh
+
+def complex_log_hermite(N_TH: int,z: np.ndarray) -> np.ndarray:
+    lh=np.empty((N_TH,)+np.shape(z),dtype=np.complex128)
+    with np.errstate(divide="ignore"):
+        for n,(h,scale) in enumerate(scaled_hermite(N_TH,z)):
+            lh[n]=scale+np.log(h)
+    return lh
+
+def log_hermite_mp(N_TH: int,z: complex) -> list:
+    lh=[0 for _ in range(N_TH)]
+    h0,h1=mp.mpf(1),2*z
+    for n in range(N_TH):
+        lh[n]=ln(fabs(h0)) if h0!=0 else mp.ninf
+        h0,h1=h1,2*z*h1-2*(n+1)*h0
+    return lh
\ No newline at end of file
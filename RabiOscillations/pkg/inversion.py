@@ -0,0 +1,64 @@
+import numpy as np
+
+from pkg.data import Simulation
+
+DIRECT_LIMIT=10**4
+TRANSFORM_LIMIT=10**7
+BLOCK=2**20
+SPREAD=12
+OVERSAMPLING=2
+METHODS=("direct","batched","transform")
+
+class InversionEngine(object):
+    def __init__(self,sim: Simulation) -> None:
+        self.__sim=sim
+
+    def method(self,tspace: np.ndarray) -> str:
+        c20,_=self.__sim.get_arrays()
+        size=len(c20)*len(tspace)
+        if size<=DIRECT_LIMIT: return "direct"
+        if size>=TRANSFORM_LIMIT and InversionEngine.uniform(tspace): return "transform"
+        return "batched"
+
+    def run(self,tspace: np.ndarray,method: str=None) -> tuple[np.ndarray,np.ndarray]:
+        tspace=np.asarray(tspace,dtype=np.float64)
+        if method is None: method=self.method(tspace)
+        if method not in METHODS: raise ValueError("Method must be one of {m}".format(m=", ".join(METHODS)))
+        if method=="direct":
+            c2t=np.array([float(self.__sim.evolve(t)[1]) for t in tspace],dtype=np.float64)
+            return 1-c2t,c2t
+        if method=="batched": return self.__sim.evolve_many(tspace)
+        if not InversionEngine.uniform(tspace): raise ValueError("The transform method needs a uniform time grid")
+        return self.__transform(tspace)
+
+    def __transform(self,tspace: np.ndarray,block: int=BLOCK) -> tuple[np.ndarray,np.ndarray]:
+        c20,rabi=self.__sim.get_arrays()
+        dt=(tspace[-1]-tspace[0])/(len(tspace)-1) if len(tspace)>1 else 0.0
+        x=np.mod(rabi*dt,2*np.pi)
+        c2t=np.empty(len(tspace),dtype=np.float64)
+        for i in range(0,len(tspace),block):
+            T=min(block,len(tspace)-i)
+            f=InversionEngine.nufft(c20*np.exp(1j*rabi*(tspace[0]+i*dt)),x,T)
+            c2t[i:i+T]=0.5*(np.sum(c20)+f.real)
+        return 1-c2t,c2t
+
+    @staticmethod
+    def uniform(tspace: np.ndarray) -> bool:
+        if len(tspace)<3: return True
+        d=np.diff(tspace)
+        return bool(np.all(np.abs(d-d[0])<=1e-9*abs(d[0])))
+
+    @staticmethod
+    def nufft(c: np.ndarray,x: np.ndarray,T: int) -> np.ndarray:
+        M=T+T%2
+        Mr=OVERSAMPLING*M
+        tau=np.pi*SPREAD/(M**2*OVERSAMPLING*(OVERSAMPLING-0.5))
+        h=2*np.pi/Mr
+        c=c*np.exp(0.5j*M*x)
+        idx=np.floor(x/h).astype(np.int64)[:,None]+np.arange(-SPREAD+1,SPREAD+1)[None,:]
+        w=c[:,None]*np.exp(-(idx*h-x[:,None])**2/(4*tau))
+        idx=np.mod(idx,Mr).ravel()
+        ftau=np.bincount(idx,weights=w.real.ravel(),minlength=Mr)+1j*np.bincount(idx,weights=w.imag.ravel(),minlength=Mr)
+        k=np.arange(-M//2,M//2)
+        f=np.sqrt(np.pi/tau)*np.exp(k**2*tau)*np.fft.ifft(ftau)[np.mod(k,Mr)]
+        return f[:T]
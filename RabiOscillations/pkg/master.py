@@ -0,0 +1,83 @@
+import numpy as np
+import scipy.sparse as sparse
+from scipy.integrate import solve_ivp
+
+from pkg.data import Simulation
+
+CHUNK=4096
+RTOL=1e-8
+ATOL=1e-10
+
+class MasterEquation(object):
+    def __init__(self,sim: Simulation,headroom: int=None) -> None:
+        c20,_=sim.get_arrays()
+        G,DETUNING=sim.get_params("G","DETUNING")
+        self.__g=float(G)
+        self.__delta=float(DETUNING)
+        self.__kappa=float(sim.get_param("KAPPA") or 0)
+        self.__gamma=float(sim.get_param("GAMMA") or 0)
+        self.__n_th=float(sim.get_param("N_THERMAL") or 0)
+        if headroom is None: headroom=int(np.ceil(6*self.__n_th))
+        self.__D=len(c20)+1+headroom
+        self.__y0=np.zeros(4*self.__D-2,dtype=np.float64)
+        self.__y0[:len(c20)]=c20
+        self.__L=self.liouvillian()
+
+    def liouvillian(self) -> sparse.csr_matrix:
+        D=self.__D
+        g,delta,gamma=self.__g,self.__delta,self.__gamma
+        k1,k2=self.__kappa*(self.__n_th+1),self.__kappa*self.__n_th
+        ee,gg=np.arange(D),D+np.arange(D)
+        x,q=2*D+np.arange(D-1),3*D-1+np.arange(D-1)
+        n=np.arange(D,dtype=np.float64)
+        m=n[:-1]
+        s=np.sqrt(m+1)
+        p=np.where(n<D-1,n+1,0)
+        rows,cols,vals=[],[],[]
+        def add(r,c,v) -> None:
+            rows.append(r)
+            cols.append(c)
+            vals.append(np.broadcast_to(v,np.shape(r)).astype(np.float64))
+        add(ee[:-1],q,-2*g*s)
+        add(gg[1:],q,2*g*s)
+        add(x,q,delta)
+        add(q,x,-delta)
+        add(q,gg[1:],-g*s)
+        add(q,ee[:-1],g*s)
+        add(ee,ee,-gamma-k1*n-k2*p)
+        add(gg,ee,gamma)
+        add(gg,gg,-k1*n-k2*p)
+        for pops in (ee,gg):
+            add(pops[:-1],pops[1:],k1*(m+1))
+            add(pops[1:],pops[:-1],k2*(m+1))
+        decay=-gamma/2-k1*(2*m+1)/2-k2*(p[:-1]+p[1:])/2
+        for coh in (x,q):
+            add(coh,coh,decay)
+            add(coh[:-1],coh[1:],k1*np.sqrt((m[:-1]+1)*(m[:-1]+2)))
+            add(coh[1:],coh[:-1],k2*np.sqrt((m[1:])*(m[1:]+1)))
+        size=4*D-2
+        return sparse.csr_matrix((np.concatenate(vals),(np.concatenate(rows),np.concatenate(cols))),shape=(size,size))
+
+    def stream(self,tspace: np.ndarray,chunk: int=CHUNK,rtol: float=RTOL,atol: float=ATOL):
+        tspace=np.asarray(tspace,dtype=np.float64)
+        D,L=self.__D,self.__L
+        y=self.__y0.copy()
+        t0=tspace[0]
+        for i in range(0,len(tspace),chunk):
+            t_eval=tspace[i:i+chunk]
+            if t_eval[-1]==t0: ys=y[:,None]
+            else:
+                sol=solve_ivp(lambda t,v: L@v,(t0,t_eval[-1]),y,method="DOP853",t_eval=t_eval,rtol=rtol,atol=atol)
+                if not sol.success: raise RuntimeError(sol.message)
+                ys=sol.y
+                y,t0=ys[:,-1].copy(),t_eval[-1]
+            c2t=ys[:D].sum(axis=0)
+            c1t=ys[D:2*D].sum(axis=0)
+            yield t_eval,c1t,c2t
+
+    def run(self,tspace: np.ndarray,chunk: int=CHUNK) -> tuple[np.ndarray,np.ndarray]:
+        c1t,c2t=[],[]
+        for _,c1,c2 in self.stream(tspace,chunk):
+            c1t.append(c1)
+            c2t.append(c2)
+        return np.concatenate(c1t),np.concatenate(c2t)
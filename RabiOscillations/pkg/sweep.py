@@ -0,0 +1,95 @@
+import hashlib,itertools,json,math,os,tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from pkg.data import Simulation
+from pkg.inversion import InversionEngine
+
+class ResultStore(object):
+    def __init__(self,directory: str) -> None:
+        os.makedirs(directory,exist_ok=True)
+        self.__directory=directory
+        # temporary files of interrupted puts start with "." and never count as stored
+        self.__keys={entry[:-4] for entry in os.listdir(directory) if entry.endswith(".npz") and not entry.startswith(".")}
+
+    def __contains__(self,key: str) -> bool:
+        return key in self.__keys
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    def keys(self) -> list:
+        return sorted(self.__keys)
+
+    def put(self,key: str,arrays: dict) -> None:
+        # one file per job, renamed into place only once complete: a crash never touches stored results
+        fd,tmp=tempfile.mkstemp(dir=self.__directory,prefix=".tmp",suffix=".npz")
+        try:
+            with os.fdopen(fd,"wb") as f:
+                np.savez_compressed(f,**arrays)
+            os.replace(tmp,os.path.join(self.__directory,key+".npz"))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.__keys.add(key)
+
+    def get(self,key: str) -> dict:
+        if key not in self.__keys: raise KeyError(key)
+        with np.load(os.path.join(self.__directory,key+".npz")) as data:
+            return {name:data[name] for name in data.files}
+
+    def params(self,key: str) -> dict:
+        return json.loads(str(self.get(key)["params"]))
+
+class Sweep(object):
+    def __init__(self,p_file: str,grid: dict,store: str,squeeze: tuple=(True,False),backend: str="numpy") -> None:
+        self.__file=p_file
+        self.__grid=grid
+        self.__store=ResultStore(store)
+        self.__squeeze=squeeze
+        self.__backend=backend
+
+    def get_store(self) -> ResultStore:
+        return self.__store
+
+    def jobs(self) -> list:
+        with open(self.__file,mode="r") as f:
+            base=json.load(f)
+        names=sorted(self.__grid.keys())
+        jobs=[]
+        for values in itertools.product(*[self.__grid[name] for name in names]):
+            overrides=dict(zip(names,values))
+            for squeeze in self.__squeeze:
+                job={"p_file":self.__file,"overrides":overrides,"squeeze":squeeze,"backend":self.__backend}
+                job["key"]=Sweep.key({**base,**overrides},squeeze,self.__backend)
+                jobs.append(job)
+        return jobs
+
+    def pending(self) -> list:
+        return [job for job in self.jobs() if job["key"] not in self.__store]
+
+    def run(self,workers: int=None,chunksize: int=None,callback=None) -> int:
+        pending=self.pending()
+        if not pending: return 0
+        if workers is None: workers=os.cpu_count() or 1
+        if chunksize is None: chunksize=max(1,math.ceil(len(pending)/(4*workers)))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for i,(key,arrays) in enumerate(ex.map(run_job,pending,chunksize=chunksize)):
+                self.__store.put(key,arrays)
+                if callback is not None: callback(i+1,len(pending))
+        return len(pending)
+
+    @staticmethod
+    def key(params: dict,squeeze: bool,backend: str) -> str:
+        payload=json.dumps({"parameters":params,"squeeze":squeeze,"backend":backend},sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def run_job(job: dict) -> tuple[str,dict]:
+    sim=Simulation(job["p_file"],job["squeeze"],job["backend"])
+    sim.load(job["overrides"])
+    T_STOP,T_STEP,T_START=sim.get_params("TIME_STOP","TIME_STEP","TIME_START")
+    tspace=np.linspace(float(T_START),float(T_STOP),math.ceil(T_STOP/T_STEP))
+    c1t,c2t=InversionEngine(sim).run(tspace)
+    c20,rabi=sim.get_arrays()
+    params=json.dumps({"overrides":job["overrides"],"squeeze":job["squeeze"],"backend":job["backend"]},sort_keys=True)
+    return job["key"],{"t":tspace,"W":c2t-c1t,"C20":c20,"RABI":rabi,"params":np.array(params)}
@@ -0,0 +1,60 @@
+import numpy as np
+
+from pkg.distribution import PhotonDistribution
+
+CHUNK=2**22
+MARGIN=6
+
+def hermite_functions(N_TH: int,u: np.ndarray) -> np.ndarray:
+    u=np.asarray(u,dtype=np.float64)
+    table=np.empty((N_TH,)+u.shape,dtype=np.float64)
+    h0=np.ones(u.shape,dtype=np.float64)
+    h1=np.sqrt(2)*u
+    scale=-u**2/2-np.log(np.pi)/4
+    for n in range(N_TH):
+        table[n]=h0*np.exp(scale)
+        h0,h1=h1,np.sqrt(2/(n+2))*u*h1-np.sqrt((n+1)/(n+2))*h0
+        m=np.maximum(np.abs(h0),np.abs(h1))
+        m=np.where(m==0,1,m)
+        h0/=m
+        h1/=m
+        scale+=np.log(m)
+    return table
+
+class WignerGrid(object):
+    def __init__(self,xvec: np.ndarray,yvec: np.ndarray,N_TH: int,chunk: int=CHUNK) -> None:
+        xvec=np.asarray(xvec,dtype=np.float64)
+        yvec=np.asarray(yvec,dtype=np.float64)
+        dx=(xvec[-1]-xvec[0])/(len(xvec)-1)
+        if not np.allclose(np.diff(xvec),dx,rtol=1e-9,atol=0): raise ValueError("xvec must be uniformly spaced")
+        support=np.sqrt(2*N_TH+1)+MARGIN
+        step=np.pi/(2*(support+np.max(np.abs(yvec))))
+        s=max(1,int(np.ceil(dx/(2*step))))
+        h=dx/(2*s)
+        J=int(np.ceil((support+np.max(np.abs(xvec)))/h))
+        self.__N_TH=N_TH
+        self.__X=len(xvec)
+        self.__rows=max(1,chunk//((J+1)*max(len(yvec),1)))
+        self.__kmin=-J
+        self.__table=hermite_functions(N_TH,xvec[0]+h*np.arange(-J,2*s*(len(xvec)-1)+J+1))
+        j=np.arange(J+1)
+        self.__plus=(2*s*np.arange(len(xvec)))[:,None]+j[None,:]+J
+        self.__minus=(2*s*np.arange(len(xvec)))[:,None]-j[None,:]+J
+        weights=np.where(j==0,h,2*h)/np.pi
+        self.__kernel=weights[:,None]*np.exp(2j*np.outer(h*j,yvec))
+
+    def render(self,psi: np.ndarray) -> np.ndarray:
+        psi=np.asarray(psi,dtype=np.complex128)[:self.__N_TH]
+        wave=psi@self.__table[:len(psi)]
+        W=np.empty((self.__kernel.shape[1],self.__X),dtype=np.float64)
+        for i in range(0,self.__X,self.__rows):
+            f=np.conj(wave[self.__plus[i:i+self.__rows]])*wave[self.__minus[i:i+self.__rows]]
+            W[:,i:i+self.__rows]=np.real(f@self.__kernel).T
+        return W
+
+    def state(self,ALPHA: complex,XI: complex) -> np.ndarray:
+        return self.render(PhotonDistribution.amplitudes(self.__N_TH,ALPHA,XI))
+
+    def frames(self,states):
+        for ALPHA,XI in states:
+            yield self.state(ALPHA,XI)